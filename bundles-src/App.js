@@ -13,6 +13,13 @@ import NoResults from "./components/NoResults";
 
 import './css/App.css';
 
+function makeCheckoutKey(){
+  if (window.crypto && window.crypto.randomUUID){
+    return window.crypto.randomUUID();
+  }
+  return Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
 class App extends Component {
 
   constructor(props){
@@ -25,6 +32,7 @@ class App extends Component {
       quickViewProduct: null,  // will be replaced by selected product attributes
       showCart: false,
       checkoutModalActive: false,
+      checkoutKey: null,  // Idempotency-Key of current checkout, reused on resubmits
     };
     this.handleSearch = this.handleSearch.bind(this);
     this.handleAddToCart = this.handleAddToCart.bind(this);
@@ -40,7 +48,10 @@ class App extends Component {
   }
 
   handleCheckoutModalShow(){
-    this.setState({checkoutModalActive: true});
+    this.setState({
+      checkoutModalActive: true,
+      checkoutKey: this.state.checkoutKey || makeCheckoutKey(),
+    });
   }
 
   handleCheckoutModalClose(){
@@ -69,11 +80,14 @@ class App extends Component {
           'Accept': 'application/json',
           'Content-Type': 'application/json',
           'X-CSRFToken': csrfToken,
+          'Idempotency-Key': this.state.checkoutKey,
         },
         body: JSON.stringify(data),
       });
 
       if (!response.ok){
+        // server stores only successful responses, so a corrected resubmit needs a fresh key
+        this.setState({checkoutKey: makeCheckoutKey()});
         alert('Ошибка при оформлении заказа. Попробуйте ещё раз или свяжитесь с нами по телефону.');
         return;
       }
@@ -81,6 +95,7 @@ class App extends Component {
 
       this.setState({
         cart: [],
+        checkoutKey: null,
       });
 
       alert("Заказ оформлен. Вам перезвонят в течение 10 минут.");
@@ -38,7 +38,7 @@ class Product extends Component{
   }
 
   render(){
-    let image = this.props.product.image;
+    let image = this.props.product.thumbnail || this.props.product.image;
     let name = this.props.product.name;
     let price = this.props.product.price;
     let id = this.props.product.id;
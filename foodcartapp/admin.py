@@ -1,18 +1,40 @@
+from django import forms
 from django.contrib import admin
 from django.shortcuts import reverse
 from django.templatetags.static import static
 from django.utils.html import format_html
 
+from .menu import set_availability
+from .models import ORDER_STATUS_TRANSITIONS
+from .models import ArchivedOrder
+from .models import ArchivedOrderItem
+from .models import Order
+from .models import OrderIntakeTask
+from .models import OrderItem
 from .models import Product
 from .models import ProductCategory
 from .models import Restaurant
 from .models import RestaurantMenuItem
+from .thumbnails import LARGE_THUMBNAIL_SIZE
+from .thumbnails import SMALL_THUMBNAIL_SIZE
+from .thumbnails import get_thumbnail_url
 
 
 class RestaurantMenuItemInline(admin.TabularInline):
     model = RestaurantMenuItem
     extra = 0
 
+    def get_queryset(self, request):
+        # __str__ строки меню читает названия ресторана и товара
+        return super().get_queryset(request).select_related('restaurant', 'product')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.related_model is not self.parent_model:
+            # Варианты выбираем один раз на весь formset, а не отдельным запросом в каждой строке
+            formfield.choices = list(formfield.choices)
+        return formfield
+
 
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
@@ -29,6 +51,20 @@ class RestaurantAdmin(admin.ModelAdmin):
     inlines = [
         RestaurantMenuItemInline
     ]
+    actions = [
+        'open_menu',
+        'close_menu',
+    ]
+
+    @admin.action(description='Вернуть в продажу всё меню выбранных ресторанов')
+    def open_menu(self, request, queryset):
+        updated = set_availability(True, restaurant_ids=list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'Изменено позиций меню: {updated}')
+
+    @admin.action(description='Снять с продажи всё меню выбранных ресторанов')
+    def close_menu(self, request, queryset):
+        updated = set_availability(False, restaurant_ids=list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'Изменено позиций меню: {updated}')
 
 
 @admin.register(Product)
@@ -79,6 +115,10 @@ class ProductAdmin(admin.ModelAdmin):
     readonly_fields = [
         'get_image_preview',
     ]
+    actions = [
+        'make_available',
+        'make_unavailable',
+    ]
 
     class Media:
         css = {
@@ -90,17 +130,158 @@ class ProductAdmin(admin.ModelAdmin):
     def get_image_preview(self, obj):
         if not obj.image:
             return 'выберите картинку'
-        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+        url = get_thumbnail_url(obj.image.storage, obj.image.name, LARGE_THUMBNAIL_SIZE, obj.has_thumbnails)
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=url)
     get_image_preview.short_description = 'превью'
 
     def get_image_list_preview(self, obj):
         if not obj.image or not obj.id:
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
-        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.image.url)
+        src = get_thumbnail_url(obj.image.storage, obj.image.name, SMALL_THUMBNAIL_SIZE, obj.has_thumbnails)
+        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=src)
     get_image_list_preview.short_description = 'превью'
 
+    @admin.action(description='Вернуть в продажу во всех ресторанах')
+    def make_available(self, request, queryset):
+        updated = set_availability(True, product_ids=list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'Изменено позиций меню: {updated}')
+
+    @admin.action(description='Снять с продажи во всех ресторанах')
+    def make_unavailable(self, request, queryset):
+        updated = set_availability(False, product_ids=list(queryset.values_list('pk', flat=True)))
+        self.message_user(request, f'Изменено позиций меню: {updated}')
+
 
 @admin.register(ProductCategory)
 class ProductAdmin(admin.ModelAdmin):
     pass
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = [
+        'product',
+    ]
+
+
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = '__all__'
+
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        if not self.instance.pk:
+            return status
+        current_status = self.initial['status']
+        if status != current_status and status not in ORDER_STATUS_TRANSITIONS[current_status]:
+            raise forms.ValidationError('Заказ нельзя перевести в этот статус из текущего')
+        return status
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    form = OrderAdminForm
+    list_display = [
+        'id',
+        'status',
+        'firstname',
+        'lastname',
+        'phonenumber',
+        'address',
+        'total',
+        'created_at',
+    ]
+    list_filter = [
+        'status',
+    ]
+    readonly_fields = [
+        'total',
+    ]
+    search_fields = [
+        'firstname',
+        'lastname',
+        'phonenumber',
+        'address',
+    ]
+    inlines = [
+        OrderItemInline
+    ]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Вызывается внутри транзакции админки, так что сумма меняется вместе с позициями
+        Order.objects.filter(pk=form.instance.pk).recalculate_totals()
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    raw_id_fields = [
+        'product',
+    ]
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = [
+        'order_id',
+        'firstname',
+        'lastname',
+        'phonenumber',
+        'address',
+        'total',
+        'created_at',
+        'archived_at',
+    ]
+    search_fields = [
+        '=order_id',
+        'firstname',
+        'lastname',
+        'phonenumber',
+        'address',
+    ]
+    date_hierarchy = 'created_at'
+    # Архив только для чтения: заказы попадают сюда командой archive_orders
+    inlines = [
+        ArchivedOrderItemInline
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OrderIntakeTask)
+class OrderIntakeTaskAdmin(admin.ModelAdmin):
+    list_display = [
+        'order',
+        'created_at',
+        'processed_at',
+        'error',
+    ]
+    list_filter = [
+        ('processed_at', admin.EmptyFieldListFilter),
+    ]
+    list_select_related = [
+        'order',
+    ]
+    raw_id_fields = [
+        'order',
+    ]
@@ -0,0 +1,62 @@
+from django.db import models, transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, OrderStatus
+
+
+ORDER_FIELDS = ['firstname', 'lastname', 'phonenumber', 'address', 'created_at', 'total', 'status']
+ORDER_ITEM_FIELDS = ['order_id', 'product_id', 'quantity', 'price']
+
+
+def get_archivable_orders(before):
+    return Order.objects.filter(status=OrderStatus.DONE, created_at__lt=before)
+
+
+def archive_batch(before, batch_size):
+    """Переносит в архив одну пачку заказов с позициями и возвращает (число заказов, число позиций).
+
+    Пачка переносится в одной транзакции: после прерывания каждый заказ лежит либо в основной
+    таблице, либо в архиве, и повторный запуск просто продолжит с оставшихся.
+    """
+    with transaction.atomic():
+        orders = list(
+            get_archivable_orders(before)
+            .select_for_update(skip_locked=True)
+            .order_by('pk')
+            .values('id', *ORDER_FIELDS)[:batch_size]
+        )
+        if not orders:
+            return 0, 0
+
+        order_ids = [order.pop('id') for order in orders]
+        items = list(OrderItem.objects.filter(order_id__in=order_ids).values(*ORDER_ITEM_FIELDS))
+        archived_at = timezone.now()
+        archived_orders = ArchivedOrder.objects.bulk_create(
+            ArchivedOrder(order_id=order_id, **order, archived_at=archived_at)
+            for order_id, order in zip(order_ids, orders)
+        )
+        # bulk_create возвращает ключи архивных заказов, по ним и привязываем позиции
+        archived_order_pks = {order.order_id: order.pk for order in archived_orders}
+        ArchivedOrderItem.objects.bulk_create(
+            ArchivedOrderItem(**{**item, 'order_id': archived_order_pks[item['order_id']]})
+            for item in items
+        )
+
+        OrderItem.objects.filter(order_id__in=order_ids).delete()
+        Order.objects.filter(pk__in=order_ids).delete()
+    return len(orders), len(items)
+
+
+def get_order_history(**lookups):
+    """Заказы вместе с архивными, только для чтения: словари с полями заказа, order_id и флагом archived."""
+    current_orders = (
+        Order.objects
+        .filter(**lookups)
+        .values(*ORDER_FIELDS, order_id=models.F('id'), archived=models.Value(False))
+    )
+    archived_orders = (
+        ArchivedOrder.objects
+        .filter(**lookups)
+        .values(*ORDER_FIELDS, 'order_id', archived=models.Value(True))
+    )
+    return current_orders.union(archived_orders, all=True)
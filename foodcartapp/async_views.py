@@ -0,0 +1,110 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+
+from .forms import ProductListQueryForm
+from .idempotency import idempotent
+from .orders import UnknownProductsError, create_order, enqueue_order
+from .serializers import aiter_products_json, dump_json, get_product_rows, serialize_product_rows
+from .views import (
+    DEFAULT_PAGE_SIZE,
+    STREAM_CHUNK_SIZE,
+    dump_banners,
+    dump_products_page,
+    filter_products,
+    get_banners_etag,
+    get_catalog_etag,
+    get_catalog_last_modified,
+    get_catalog_response,
+    json_errors,
+    load_catalog,
+    parse_order,
+)
+
+
+# Асинхронные версии API витрины для запуска под ASGI, см. star_burger/asgi.py.
+# Запросы к базе через async ORM, а транзакции — в sync_to_async: async ORM их не поддерживает
+
+
+def async_condition(etag_func, last_modified_func):
+    """Как condition, но ETag и дата изменения считаются в потоке для синхронного кода.
+
+    condition зовёт их прямо в цикле событий, а версия каталога в DjangoCacheBackend — это запрос к кэшу по сети.
+    """
+    def get_validators(request):
+        return etag_func(request), last_modified_func(request)
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request):
+            etag, last_modified = await sync_to_async(get_validators)(request)
+            etag = quote_etag(etag)
+            last_modified = int(last_modified.timestamp())
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request)
+            if request.method in ('GET', 'HEAD'):
+                if not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                response.headers.setdefault('ETag', etag)
+            return response
+        return wrapper
+    return decorator
+
+
+@cache_control(public=True, max_age=settings.BANNERS_CACHE_MAX_AGE)
+@condition(etag_func=get_banners_etag)
+async def banners_list_api(request):
+    return HttpResponse(dump_banners(), content_type='application/json')
+
+
+@cache_control(public=True, max_age=settings.CATALOG_CACHE_MAX_AGE)
+@async_condition(get_catalog_etag, get_catalog_last_modified)
+async def product_list_api(request):
+    if not request.GET:
+        catalog, etag = await sync_to_async(load_catalog)(request)
+        return get_catalog_response(request, catalog, etag)
+
+    form = ProductListQueryForm(request.GET)
+    if not form.is_valid():
+        return json_errors(form.errors)
+    query = form.cleaned_data
+    products = filter_products(query)
+
+    if query['stream']:
+        content = aiter_products_json(products.order_by('pk'), fields=query['fields'], chunk_size=STREAM_CHUNK_SIZE)
+        return StreamingHttpResponse(content, content_type='application/json')
+
+    if not form.is_paginated:
+        rows = [row async for row in get_product_rows(products.order_by('pk'), query['fields'])]
+        content = dump_json(serialize_product_rows(rows, query['fields']), pretty=query['pretty'])
+        return HttpResponse(content, content_type='application/json')
+
+    limit = query['limit'] or DEFAULT_PAGE_SIZE
+    products_page = get_product_rows(products.after(query['cursor'] or 0), query['fields'])[:limit + 1]
+    rows = [row async for row in products_page]
+    return HttpResponse(dump_products_page(rows, limit, query), content_type='application/json')
+
+
+@require_POST
+@idempotent
+async def register_order(request):
+    order_fields, errors_response = parse_order(request)
+    if errors_response:
+        return errors_response
+
+    if settings.ORDER_INTAKE_ASYNC:
+        order = await sync_to_async(enqueue_order)(**order_fields)
+        return JsonResponse({'id': order.id}, status=202)
+
+    try:
+        order = await sync_to_async(create_order)(**order_fields)
+    except UnknownProductsError as error:
+        return json_errors({'products': [str(error)]})
+    return JsonResponse({'id': order.id}, status=201)
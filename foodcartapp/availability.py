@@ -0,0 +1,121 @@
+import time
+from array import array
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import RestaurantMenuItem
+
+
+MATRIX_KEY = 'foodcartapp:availability:matrix'
+LOCK_KEY = 'foodcartapp:availability:lock'
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.01
+
+
+class AvailabilityMatrix:
+    """Какие товары в продаже в каких ресторанах.
+
+    Колонки — рестораны в порядке добавления, для каждого товара хранится битовая маска колонок.
+    Новые рестораны дописываются в конец, поэтому матрицу можно менять по одной клетке.
+    """
+
+    def __init__(self):
+        self.restaurant_ids = array('l')
+        self.columns = {}
+        self.product_masks = {}
+
+    @classmethod
+    def build(cls):
+        matrix = cls()
+        menu = (
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .order_by('restaurant_id')
+            .values_list('restaurant_id', 'product_id')
+        )
+        for restaurant_id, product_id in menu:
+            matrix.set(product_id, restaurant_id, True)
+        return matrix
+
+    def get_column(self, restaurant_id):
+        if restaurant_id not in self.columns:
+            self.columns[restaurant_id] = len(self.restaurant_ids)
+            self.restaurant_ids.append(restaurant_id)
+        return self.columns[restaurant_id]
+
+    def set(self, product_id, restaurant_id, available):
+        bit = 1 << self.get_column(restaurant_id)
+        mask = self.product_masks.get(product_id, 0)
+        mask = mask | bit if available else mask & ~bit
+        if mask:
+            self.product_masks[product_id] = mask
+        else:
+            self.product_masks.pop(product_id, None)
+
+    def row(self, product_id, restaurant_ids):
+        mask = self.product_masks.get(product_id, 0)
+        return [
+            restaurant_id in self.columns and bool(mask >> self.columns[restaurant_id] & 1)
+            for restaurant_id in restaurant_ids
+        ]
+
+
+def get_cache():
+    return caches[settings.AVAILABILITY_CACHE_ALIAS]
+
+
+def acquire_lock(cache, wait=True):
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while not cache.add(LOCK_KEY, 1, timeout=LOCK_TIMEOUT):
+        if not wait or time.monotonic() > deadline:
+            return False
+        time.sleep(LOCK_POLL_INTERVAL)
+    return True
+
+
+def get_availability_matrix():
+    cache = get_cache()
+    matrix = cache.get(MATRIX_KEY)
+    if matrix is not None:
+        return matrix
+
+    # Пересобираем под блокировкой, чтобы изменения меню, пришедшие во время сборки, легли поверх неё
+    if not acquire_lock(cache, wait=False):
+        return AvailabilityMatrix.build()
+    try:
+        matrix = AvailabilityMatrix.build()
+        cache.set(MATRIX_KEY, matrix, timeout=settings.AVAILABILITY_CACHE_TIMEOUT)
+    finally:
+        cache.delete(LOCK_KEY)
+    return matrix
+
+
+def update_availability(changes):
+    """Применяет изменения [(id товара, id ресторана, в продаже ли)] к закэшированной матрице."""
+    cache = get_cache()
+    if not acquire_lock(cache):
+        # Блокировку так и не отпустили: сбрасываем матрицу, её пересоберут при следующем запросе
+        cache.delete(MATRIX_KEY)
+        return
+
+    try:
+        matrix = cache.get(MATRIX_KEY)
+        if matrix is None:
+            return
+        for product_id, restaurant_id, available in changes:
+            matrix.set(product_id, restaurant_id, available)
+        cache.set(MATRIX_KEY, matrix, timeout=settings.AVAILABILITY_CACHE_TIMEOUT)
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def reset_availability():
+    cache = get_cache()
+    # Ждём, пока допишут текущие изменения, иначе они вернут в кэш устаревшую матрицу
+    locked = acquire_lock(cache)
+    try:
+        cache.delete(MATRIX_KEY)
+    finally:
+        if locked:
+            cache.delete(LOCK_KEY)
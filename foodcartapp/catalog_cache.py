@@ -0,0 +1,192 @@
+import math
+import threading
+import time
+import uuid
+from collections import namedtuple
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+REBUILD_WAIT_TIMEOUT = 5
+REBUILD_POLL_INTERVAL = 0.02
+
+
+CatalogVersion = namedtuple('CatalogVersion', ['token', 'modified'])
+
+
+def make_version():
+    # HTTP-даты с точностью до секунды, поэтому микросекунды отбрасываем сразу
+    return CatalogVersion(
+        token=uuid.uuid4().hex,
+        modified=timezone.now().replace(microsecond=0),
+    )
+
+
+class LocalMemoryBackend:
+    """Хранит каталог в памяти процесса. Подходит для одного воркера.
+
+    Сброс после изменения меню доходит только до воркера, который сохранял изменения. Поэтому раз в
+    max_age секунд каталог сверяется с базой: если он не изменился, версия и ETag остаются прежними.
+    """
+
+    def __init__(self, max_age=60):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._version = None
+        self._expires_at = None
+        self._blobs = {}
+        self._rebuild_locks = set()
+
+    def _set_version(self, version):
+        self._version = version
+        self._expires_at = time.monotonic() + self.max_age
+        self._blobs.clear()
+
+    def get_version(self):
+        with self._lock:
+            if self._version is None:
+                self._set_version(make_version())
+            return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._set_version(make_version())
+            return self._version
+
+    def start_revalidation(self):
+        """Возвращает версию, которую пора сверить с базой, или None.
+
+        Версию получает только один поток, остальные тем временем отдают прежнюю.
+        """
+        with self._lock:
+            if self._version is None or time.monotonic() < self._expires_at:
+                return None
+            self._expires_at = math.inf
+            return self._version
+
+    def finish_revalidation(self, version, blob):
+        with self._lock:
+            if version != self._version:
+                # Пока сверяли, каталог сбросили: пересобранный блоб мог устареть
+                return
+            if blob is not None and blob != self._blobs.get(version):
+                self._set_version(make_version())
+                self._blobs[self._version] = blob
+            else:
+                self._expires_at = time.monotonic() + self.max_age
+
+    def get_blob(self, version):
+        return self._blobs.get(version)
+
+    def set_blob(self, version, blob):
+        with self._lock:
+            if version == self._version:
+                self._blobs = {version: blob}
+
+    def acquire_rebuild_lock(self, version):
+        with self._lock:
+            if version in self._rebuild_locks:
+                return False
+            self._rebuild_locks.add(version)
+            return True
+
+    def release_rebuild_lock(self, version):
+        with self._lock:
+            self._rebuild_locks.discard(version)
+
+
+class DjangoCacheBackend:
+    """Хранит каталог в кэше Django, общем для всех воркеров."""
+
+    key_prefix = 'foodcartapp:catalog'
+
+    def __init__(self, alias='default', timeout=24 * 60 * 60, lock_timeout=30):
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+
+    def _key(self, *parts):
+        return ':'.join([self.key_prefix, *parts])
+
+    def get_version(self):
+        version = self.cache.get(self._key('version'))
+        if version is None:
+            self.cache.add(self._key('version'), make_version(), timeout=None)
+            version = self.cache.get(self._key('version'))
+        return version
+
+    def bump_version(self):
+        version = make_version()
+        self.cache.set(self._key('version'), version, timeout=None)
+        return version
+
+    def start_revalidation(self):
+        # Версия общая для всех воркеров и сбрасывается сразу, сверять нечего
+        return None
+
+    def finish_revalidation(self, version, blob):
+        pass
+
+    def get_blob(self, version):
+        return self.cache.get(self._key('blob', version.token))
+
+    def set_blob(self, version, blob):
+        self.cache.set(self._key('blob', version.token), blob, timeout=self.timeout)
+
+    def acquire_rebuild_lock(self, version):
+        return self.cache.add(self._key('lock', version.token), 1, timeout=self.lock_timeout)
+
+    def release_rebuild_lock(self, version):
+        self.cache.delete(self._key('lock', version.token))
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    backend_class = import_string(settings.CATALOG_CACHE_BACKEND)
+    return backend_class(**settings.CATALOG_CACHE_OPTIONS)
+
+
+def get_catalog_version(build):
+    backend = get_backend()
+    version = backend.start_revalidation()
+    if version is not None:
+        blob = None
+        try:
+            blob = build()
+        finally:
+            backend.finish_revalidation(version, blob)
+    return backend.get_version()
+
+
+def invalidate_catalog():
+    return get_backend().bump_version()
+
+
+def get_catalog_blob(build):
+    backend = get_backend()
+    version = get_catalog_version(build)
+
+    blob = backend.get_blob(version)
+    if blob is not None:
+        return blob
+
+    # Пересобирает каталог только тот, кто взял блокировку, остальные ждут результата
+    if backend.acquire_rebuild_lock(version):
+        try:
+            blob = build()
+            backend.set_blob(version, blob)
+        finally:
+            backend.release_rebuild_lock(version)
+        return blob
+
+    deadline = time.monotonic() + REBUILD_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        blob = backend.get_blob(version)
+        if blob is not None:
+            return blob
+    return build()
@@ -0,0 +1,83 @@
+import base64
+
+from django import forms
+
+from .serializers import PRODUCT_FIELDS
+
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_cursor(cursor):
+    return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+
+class ProductListQueryForm(forms.Form):
+    # TextInput отдаёт строку как есть, и BooleanField понимает ?special=0 как False
+    category = forms.IntegerField(required=False, min_value=1)
+    special = forms.BooleanField(required=False, widget=forms.TextInput)
+    fields = forms.CharField(required=False)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=MAX_PAGE_SIZE)
+    cursor = forms.CharField(required=False)
+    pretty = forms.BooleanField(required=False, widget=forms.TextInput)
+    stream = forms.BooleanField(required=False, widget=forms.TextInput)
+
+    def clean_fields(self):
+        fields = [field for field in self.cleaned_data['fields'].split(',') if field]
+        unknown_fields = set(fields) - set(PRODUCT_FIELDS)
+        if unknown_fields:
+            raise forms.ValidationError(f'Неизвестные поля: {", ".join(sorted(unknown_fields))}')
+        return fields
+
+    def clean_cursor(self):
+        cursor = self.cleaned_data['cursor']
+        if not cursor:
+            return None
+        try:
+            return decode_cursor(cursor)
+        except ValueError:
+            raise forms.ValidationError('Некорректный курсор')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        paginated = cleaned_data.get('limit') is not None or cleaned_data.get('cursor') is not None
+        if cleaned_data.get('stream') and paginated:
+            raise forms.ValidationError('Потоковую выдачу нельзя совмещать с постраничной')
+        if cleaned_data.get('stream') and cleaned_data.get('pretty'):
+            raise forms.ValidationError('Потоковая выдача не поддерживает pretty')
+        return cleaned_data
+
+    @property
+    def is_paginated(self):
+        return self.cleaned_data['limit'] is not None or self.cleaned_data['cursor'] is not None
+
+
+class OrderItemsField(forms.Field):
+    def to_python(self, value):
+        if not isinstance(value, list) or not value:
+            raise forms.ValidationError('Нужен непустой список товаров')
+
+        items = []
+        for item in value:
+            if not isinstance(item, dict):
+                raise forms.ValidationError('Каждый товар должен быть объектом')
+            product_id = item.get('product')
+            quantity = item.get('quantity')
+            if type(product_id) is not int or type(quantity) is not int:
+                raise forms.ValidationError('product и quantity должны быть целыми числами')
+            if quantity < 1:
+                raise forms.ValidationError('Количество должно быть больше нуля')
+            items.append((product_id, quantity))
+        return items
+
+
+class OrderForm(forms.Form):
+    firstname = forms.CharField(max_length=50)
+    lastname = forms.CharField(max_length=50)
+    phonenumber = forms.RegexField(regex=r'^\+?[\d\s()-]{5,20}$', max_length=20)
+    address = forms.CharField(max_length=200)
+    products = OrderItemsField()
@@ -0,0 +1,103 @@
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+
+from .models import IdempotencyKey
+
+
+MAX_KEY_LENGTH = 255
+
+
+def hash_key(request, key):
+    return hashlib.sha256(f'{request.path}:{key}'.encode()).hexdigest()
+
+
+def hash_body(request):
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def key_reused_response():
+    return JsonResponse(
+        {'errors': {'__all__': ['Idempotency-Key уже использован с другим телом запроса']}},
+        status=422,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return key_reused_response()
+    response = HttpResponse(
+        bytes(record.content),
+        status=record.status_code,
+        content_type=record.content_type,
+    )
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Повторный запрос с тем же заголовком Idempotency-Key получает сохранённый ответ."""
+    if iscoroutinefunction(view):
+        return idempotent_async(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse({'errors': {'__all__': ['Слишком длинный Idempotency-Key']}}, status=400, json_dumps_params={
+                'ensure_ascii': False,
+            })
+
+        ttl = timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        key_hash = hash_key(request, key)
+        request_hash = hash_body(request)
+
+        record = IdempotencyKey.objects.fresh(ttl).filter(key=key_hash).first()
+        if record:
+            return replay(record, request_hash)
+
+        # Просроченные ключи удаляет команда purge_idempotency_keys, а не каждый заказ:
+        # иначе одновременные заказы дерутся за блокировки одних и тех же строк
+        with transaction.atomic():
+            IdempotencyKey.objects.expired(ttl).filter(key=key_hash).delete()
+            try:
+                # Конкурентный дубль упрётся в уникальный индекс и дождётся коммита первого запроса
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(key=key_hash, request_hash=request_hash)
+            except IntegrityError:
+                return replay(IdempotencyKey.objects.get(key=key_hash), request_hash)
+
+            response = view(request, *args, **kwargs)
+            # Запоминаем только успех: после ошибки клиент исправит данные и повторит запрос с тем же ключом
+            if not 200 <= response.status_code < 300 or response.streaming:
+                transaction.set_rollback(True)
+                return response
+            record.status_code = response.status_code
+            record.content_type = response['Content-Type']
+            record.content = response.content
+            record.save(update_fields=['status_code', 'content_type', 'content'])
+        return response
+
+    return wrapper
+
+
+def idempotent_async(view):
+    # Ключ и ответ должны сохраниться в одной транзакции с заказом, а async ORM транзакций не умеет.
+    # Поэтому запрос с ключом целиком уходит в поток для синхронного кода, view выполняется внутри транзакции
+    sync_wrapper = idempotent(async_to_sync(view))
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not request.headers.get('Idempotency-Key'):
+            return await view(request, *args, **kwargs)
+        return await sync_to_async(sync_wrapper)(request, *args, **kwargs)
+
+    return wrapper
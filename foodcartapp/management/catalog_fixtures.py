@@ -0,0 +1,31 @@
+from foodcartapp.models import Product, ProductCategory, Restaurant, RestaurantMenuItem
+
+
+def create_catalog(products_count, categories_count=0):
+    """Ресторан с products_count товарами в меню для замеров. Возвращает (ресторан, товары).
+
+    С categories_count товары раскладываются по категориям и получают описание, тогда ответ API
+    по размеру ближе к настоящему.
+    """
+    restaurant = Restaurant.objects.create(name='Ресторан для замеров')
+    categories = ProductCategory.objects.bulk_create(
+        ProductCategory(name=f'Категория {number}') for number in range(categories_count)
+    )
+    products = Product.objects.bulk_create(
+        (
+            Product(
+                name=f'Бургер для замеров {number}',
+                category=categories[number % len(categories)] if categories else None,
+                price=f'{100 + number % 500}.50',
+                image=f'burger_{number}.jpg',
+                description='Сочная котлета, свежие овощи и фирменный соус' if categories else '',
+            )
+            for number in range(products_count)
+        ),
+        batch_size=1000,
+    )
+    RestaurantMenuItem.objects.bulk_create(
+        (RestaurantMenuItem(restaurant=restaurant, product=product) for product in products),
+        batch_size=1000,
+    )
+    return restaurant, products
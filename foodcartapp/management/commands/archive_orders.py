@@ -0,0 +1,43 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodcartapp.archive import archive_batch, get_archivable_orders
+
+
+class Command(BaseCommand):
+    help = 'Переносит выполненные заказы старше N дней вместе с позициями в архивные таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='архивировать заказы старше стольких дней')
+        parser.add_argument('--batch-size', type=int, default=1000, help='заказов в одной транзакции')
+        parser.add_argument('--pause', type=float, default=0, help='пауза между пачками, с')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        remaining = get_archivable_orders(before).count()
+        self.stdout.write(f'к переносу: {remaining} заказов старше {before:%Y-%m-%d %H:%M}')
+
+        moved_orders = moved_items = 0
+        started_at = time.monotonic()
+        while True:
+            orders_count, items_count = archive_batch(before, options['batch_size'])
+            if not orders_count:
+                break
+            moved_orders += orders_count
+            moved_items += items_count
+            elapsed = time.monotonic() - started_at
+            self.stdout.write(
+                f'перенесено: {moved_orders}/{remaining} заказов, {moved_items} позиций '
+                f'({moved_orders / elapsed:.0f} заказов/с)'
+            )
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {moved_orders} заказов и {moved_items} позиций за {elapsed:.2f} с '
+            f'({(moved_orders + moved_items) / elapsed if elapsed else 0:.0f} строк/с)'
+        ))
@@ -0,0 +1,164 @@
+import asyncio
+import io
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from foodcartapp.management.catalog_fixtures import create_catalog
+from foodcartapp.models import Product
+
+
+def run_wsgi(url, clients, requests_per_client, latency, threads):
+    """Синхронный сервер с пулом потоков: поток занят соединением, пока медленный клиент шлёт и читает данные."""
+    from star_burger.wsgi import application
+
+    path, _, query = url.partition('?')
+    host = settings.ALLOWED_HOSTS[0]
+
+    server_threads = threading.BoundedSemaphore(threads)
+
+    def handle_request():
+        started_at = time.perf_counter()
+        environ = {'PATH_INFO': path, 'QUERY_STRING': query, 'HTTP_HOST': host, 'wsgi.input': io.BytesIO()}
+        setup_testing_defaults(environ)
+        statuses = []
+        # Поток сервера занят, пока медленный клиент шлёт запрос и читает ответ
+        with server_threads:
+            time.sleep(latency)
+            body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            try:
+                for _ in body:
+                    time.sleep(latency)
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+        assert statuses[0].startswith('200'), statuses[0]
+        return time.perf_counter() - started_at
+
+    def client():
+        return [handle_request() for _ in range(requests_per_client)]
+
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        futures = [executor.submit(client) for _ in range(clients)]
+        return [timing for future in futures for timing in future.result()]
+
+
+def run_asgi(url, clients, requests_per_client, latency):
+    """Один поток с циклом событий: пока клиент медленно шлёт и читает, обслуживаются другие."""
+    from star_burger.asgi import application
+
+    split_url = urlsplit(url)
+    host = settings.ALLOWED_HOSTS[0].encode()
+
+    async def handle_request():
+        started_at = time.perf_counter()
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': split_url.path,
+            'raw_path': split_url.path.encode(),
+            'query_string': split_url.query.encode(),
+            'root_path': '',
+            'headers': [(b'host', host)],
+            'client': ('127.0.0.1', 0),
+            'server': ('127.0.0.1', 80),
+        }
+        request_sent = False
+        statuses = []
+
+        async def receive():
+            nonlocal request_sent
+            if request_sent:
+                # Клиент больше ничего не шлёт, но соединение не рвёт
+                await asyncio.Event().wait()
+            request_sent = True
+            await asyncio.sleep(latency)
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+            elif message['type'] == 'http.response.body':
+                await asyncio.sleep(latency)
+
+        await application(scope, receive, send)
+        assert statuses[0] == 200, statuses[0]
+        return time.perf_counter() - started_at
+
+    async def client():
+        return [await handle_request() for _ in range(requests_per_client)]
+
+    async def main():
+        results = await asyncio.gather(*(client() for _ in range(clients)))
+        return [timing for timings in results for timing in timings]
+
+    return asyncio.run(main())
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает пропускную способность API под WSGI и ASGI при медленных клиентах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/products/?limit=20')
+        parser.add_argument('--clients', type=int, default=200, help='одновременных клиентов')
+        parser.add_argument('--requests-per-client', type=int, default=5)
+        parser.add_argument('--latency', type=float, default=0.05, help='задержка сети в каждую сторону, с')
+        parser.add_argument('--threads', type=int, default=8, help='потоков у WSGI-сервера')
+        parser.add_argument('--products', type=int, default=200, help='сколько товаров создать для замера')
+        parser.add_argument('--server', choices=['wsgi', 'asgi'], help='замерить только один сервер в этом процессе')
+
+    def measure(self, options):
+        args = (options['url'], options['clients'], options['requests_per_client'], options['latency'])
+        started_at = time.perf_counter()
+        if options['server'] == 'wsgi':
+            timings = run_wsgi(*args, threads=options['threads'])
+            name = f'WSGI, {options["threads"]} потоков'
+        else:
+            timings = run_asgi(*args)
+            name = 'ASGI, один поток'
+        elapsed = time.perf_counter() - started_at
+        self.stdout.write(
+            f'{name:>18}: {len(timings) / elapsed:.0f} запросов/с, '
+            f'медиана {statistics.median(timings) * 1000:.0f} мс, '
+            f'p95 {statistics.quantiles(timings, n=20)[-1] * 1000:.0f} мс'
+        )
+
+    def handle(self, *args, **options):
+        if options['server']:
+            self.measure(options)
+            return
+
+        self.stdout.write(
+            f'{options["clients"]} клиентов × {options["requests_per_client"]} запросов к {options["url"]}, '
+            f'задержка {options["latency"] * 1000:.0f} мс в каждую сторону'
+        )
+        self.stdout.flush()
+        restaurant, products = create_catalog(options['products'])
+        try:
+            # Каждый сервер в своём процессе: набор view выбирается при загрузке urls
+            for server, async_views in [('wsgi', 'False'), ('asgi', 'True')]:
+                command = [
+                    sys.executable, os.path.join(settings.BASE_DIR, 'manage.py'), 'benchmark_asgi',
+                    '--server', server,
+                    '--url', options['url'],
+                    '--clients', str(options['clients']),
+                    '--requests-per-client', str(options['requests_per_client']),
+                    '--latency', str(options['latency']),
+                    '--threads', str(options['threads']),
+                ]
+                subprocess.run(command, env={**os.environ, 'ASYNC_API_VIEWS': async_views}, check=True)
+        finally:
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
+            restaurant.delete()
@@ -0,0 +1,93 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from foodcartapp.models import Product, Restaurant, RestaurantMenuItem
+
+
+def available_legacy(products, restaurants=None):
+    menu_items = RestaurantMenuItem.objects.filter(availability=True)
+    if restaurants is not None:
+        menu_items = menu_items.filter(restaurant__in=restaurants)
+    return products.filter(pk__in=menu_items.values_list('product'))
+
+
+def create_menu(restaurants_count, products_count, availability_ratio):
+    restaurants = Restaurant.objects.bulk_create(
+        Restaurant(name=f'Ресторан {number}') for number in range(restaurants_count)
+    )
+    products = Product.objects.bulk_create(
+        (
+            Product(name=f'Бургер {number}', price='100.00', image=f'burger_{number}.jpg')
+            for number in range(products_count)
+        ),
+        batch_size=1000,
+    )
+    RestaurantMenuItem.objects.bulk_create(
+        (
+            RestaurantMenuItem(
+                restaurant=restaurant,
+                product=product,
+                availability=random.random() < availability_ratio,
+            )
+            for restaurant in restaurants
+            for product in products
+        ),
+        batch_size=5000,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return restaurants
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает старый IN-подзапрос и EXISTS в ProductQuerySet.available()'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=100)
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--availability-ratio', type=float, default=0.05)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def measure(self, name, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                started_at = time.perf_counter()
+                found = len(list(queryset.values_list('pk', flat=True)))
+                timings.append(time.perf_counter() - started_at)
+        self.stdout.write(
+            f'{name:<28} {min(timings) * 1000:9.1f} мс  запросов: {len(queries)}  товаров: {found}'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{connection.vendor}: {options["restaurants"]} ресторанов × {options["products"]} товаров'
+        )
+        # Тестовое меню живёт только внутри транзакции и откатывается
+        with transaction.atomic():
+            restaurants = create_menu(
+                options['restaurants'],
+                options['products'],
+                options['availability_ratio'],
+            )
+            some_restaurants = [restaurant.pk for restaurant in restaurants[:10]]
+
+            self.measure('IN (подзапрос)', available_legacy(Product.objects.all()), options['repeat'])
+            self.measure('EXISTS', Product.objects.available(), options['repeat'])
+            self.measure('IN, страница 100', available_legacy(Product.objects.all()).after(0)[:100], options['repeat'])
+            self.measure('EXISTS, страница 100', Product.objects.available().after(0)[:100], options['repeat'])
+            self.measure(
+                'IN, 10 ресторанов',
+                available_legacy(Product.objects.all(), restaurants=some_restaurants),
+                options['repeat'],
+            )
+            self.measure(
+                'EXISTS, 10 ресторанов',
+                Product.objects.available(restaurants=some_restaurants),
+                options['repeat'],
+            )
+            transaction.set_rollback(True)
@@ -0,0 +1,66 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from foodcartapp.management.catalog_fixtures import create_catalog
+from foodcartapp.models import Product
+from foodcartapp.serializers import dump_json, serialize_products
+
+
+def dump_products_legacy(products):
+    dumped_products = []
+    for product in products.select_related('category'):
+        dumped_products.append({
+            'id': product.id,
+            'name': product.name,
+            'price': product.price,
+            'special_status': product.special_status,
+            'description': product.description,
+            'category': {
+                'id': product.category.id,
+                'name': product.category.name,
+            } if product.category else None,
+            'image': product.image.url,
+            'restaurant': {
+                'id': product.id,
+                'name': product.name,
+            }
+        })
+    return json.dumps(
+        dumped_products,
+        cls=DjangoJSONEncoder,
+        ensure_ascii=False,
+        indent=4,
+    ).encode('utf-8')
+
+
+def dump_products_compact(products):
+    return dump_json(serialize_products(products))
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает старую и компактную сериализацию каталога для /api/products/'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            # Тестовые товары живут только внутри транзакции и откатываются
+            with transaction.atomic():
+                create_catalog(size, categories_count=10)
+                products = Product.objects.available()
+                for name, dump in [('legacy', dump_products_legacy), ('compact', dump_products_compact)]:
+                    timings = []
+                    for _ in range(options['repeat']):
+                        started_at = time.perf_counter()
+                        content = dump(products)
+                        timings.append(time.perf_counter() - started_at)
+                    self.stdout.write(
+                        f'{size:>7} товаров  {name:<8} {min(timings) * 1000:9.1f} мс  {len(content) / 1024:9.1f} КБ'
+                    )
+                transaction.set_rollback(True)
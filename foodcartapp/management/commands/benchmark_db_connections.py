@@ -0,0 +1,96 @@
+import copy
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import Client
+
+from foodcartapp.management.catalog_fixtures import create_catalog
+from foodcartapp.models import Product
+
+
+SQLITE_WAL_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA temp_store=MEMORY;'
+        'PRAGMA cache_size=-20000;'
+        'PRAGMA mmap_size=134217728;'
+    ),
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': 5,
+}
+
+
+def get_profiles(settings_dict):
+    profiles = [
+        ('как в настройках', {}),
+        ('новое соединение на запрос', {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}),
+        ('постоянное соединение', {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': False}),
+        ('постоянное + проверка', {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True}),
+    ]
+    if settings_dict['ENGINE'] == 'django.db.backends.sqlite3':
+        profiles += [
+            ('новое соединение + WAL', {'CONN_MAX_AGE': 0, 'OPTIONS': SQLITE_WAL_OPTIONS}),
+            ('постоянное + проверка + WAL', {
+                'CONN_MAX_AGE': 600,
+                'CONN_HEALTH_CHECKS': True,
+                'OPTIONS': SQLITE_WAL_OPTIONS,
+            }),
+        ]
+    return profiles
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает задержку /api/products/ при разных настройках соединения с базой'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--products', type=int, default=200, help='сколько товаров создать для замера')
+        parser.add_argument('--query', default='limit=20', help='параметры запроса к каталогу')
+
+    def measure(self, client, url, requests_count):
+        timings = []
+        for _ in range(requests_count):
+            started_at = time.perf_counter()
+            # Тестовый клиент не закрывает соединения сам, повторяем то, что делает обработчик запросов
+            close_old_connections()
+            response = client.get(url)
+            close_old_connections()
+            timings.append(time.perf_counter() - started_at)
+            assert response.status_code == 200, response.status_code
+        return timings
+
+    def handle(self, *args, **options):
+        original_settings = copy.deepcopy(connection.settings_dict)
+        if original_settings['ENGINE'] == 'django.db.backends.sqlite3':
+            with connection.cursor() as cursor:
+                original_journal_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+        url = f'/api/products/?{options["query"]}'
+        restaurant, products = create_catalog(options['products'])
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        self.stdout.write(f'{connection.vendor}, {options["requests"]} запросов к {url}')
+        try:
+            for name, overrides in get_profiles(original_settings):
+                connection.close()
+                connection.settings_dict.update(copy.deepcopy(original_settings))
+                connection.settings_dict.update(copy.deepcopy(overrides))
+                # Прогрев: первое соединение и компиляция шаблонов URL в замер не попадают
+                self.measure(client, url, 10)
+
+                timings = self.measure(client, url, options['requests'])
+                self.stdout.write(
+                    f'{name:>30}: медиана {statistics.median(timings) * 1000:.2f} мс, '
+                    f'p95 {statistics.quantiles(timings, n=20)[-1] * 1000:.2f} мс'
+                )
+        finally:
+            connection.close()
+            connection.settings_dict.clear()
+            connection.settings_dict.update(original_settings)
+            if original_settings['ENGINE'] == 'django.db.backends.sqlite3':
+                with connection.cursor() as cursor:
+                    cursor.execute(f'PRAGMA journal_mode={original_journal_mode}')
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
+            restaurant.delete()
@@ -0,0 +1,76 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.matching import RestaurantMatcher
+
+
+def match_naive(menu, orders_products):
+    menus = {}
+    for restaurant_id, product_id in menu:
+        menus.setdefault(restaurant_id, []).append(product_id)
+    return {
+        order_id: [
+            restaurant_id
+            for restaurant_id, restaurant_products in menus.items()
+            if all(product_id in restaurant_products for product_id in product_ids)
+        ]
+        for order_id, product_ids in orders_products.items()
+    }
+
+
+def match_frozensets(menu, orders_products):
+    menus = {}
+    for restaurant_id, product_id in menu:
+        menus.setdefault(restaurant_id, set()).add(product_id)
+    menus = {restaurant_id: frozenset(products) for restaurant_id, products in menus.items()}
+    return {
+        order_id: [
+            restaurant_id
+            for restaurant_id, restaurant_products in menus.items()
+            if product_ids <= restaurant_products
+        ]
+        for order_id, product_ids in orders_products.items()
+    }
+
+
+def match_bitsets(menu, orders_products):
+    return RestaurantMatcher(menu).match_orders(orders_products)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает подбор ресторанов для заказов: перебор, frozenset и битовые маски'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--restaurants', type=int, default=100)
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--items-per-order', type=int, default=4)
+        parser.add_argument('--availability-ratio', type=float, default=0.9)
+        parser.add_argument('--naive', action='store_true', help='добавить перебор по спискам, он очень медленный')
+
+    def handle(self, *args, **options):
+        menu = [
+            (restaurant_id, product_id)
+            for restaurant_id in range(1, options['restaurants'] + 1)
+            for product_id in range(1, options['products'] + 1)
+            if random.random() < options['availability_ratio']
+        ]
+        orders_products = {
+            order_id: set(random.sample(range(1, options['products'] + 1), options['items_per_order']))
+            for order_id in range(1, options['orders'] + 1)
+        }
+
+        strategies = [('frozenset', match_frozensets), ('битовые маски', match_bitsets)]
+        if options['naive']:
+            strategies.insert(0, ('перебор', match_naive))
+
+        reference = None
+        for name, match in strategies:
+            started_at = time.perf_counter()
+            matches = {order_id: sorted(restaurant_ids) for order_id, restaurant_ids in match(menu, orders_products).items()}
+            elapsed = time.perf_counter() - started_at
+            reference = reference or matches
+            assert matches == reference, f'{name}: результаты не совпали'
+            self.stdout.write(f'{name:<14} {elapsed * 1000:9.1f} мс')
@@ -0,0 +1,107 @@
+import io
+import statistics
+import time
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+
+# Стек до разделения настроек на dev и prod: панель отладки стояла в нём и при DEBUG=False
+LEGACY_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'debug_toolbar.middleware.DebugToolbarMiddleware',
+]
+
+METRICS_MIDDLEWARE = 'star_burger.middleware.RequestMetricsMiddleware'
+
+URLS = [
+    '/api/banners/',
+    '/api/products/',
+    '/api/products/?limit=100',
+    '/',
+]
+
+
+def request(handler, url, headers):
+    path, _, query = url.partition('?')
+    environ = {
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'HTTP_HOST': settings.ALLOWED_HOSTS[0],
+        'HTTP_ACCEPT_ENCODING': 'gzip, deflate, br',
+        'wsgi.input': io.BytesIO(),
+        **headers,
+    }
+    setup_testing_defaults(environ)
+    response_headers = {}
+
+    def start_response(status, headers, exc_info=None):
+        response_headers.update(headers)
+        response_headers['status'] = status
+
+    body = handler(environ, start_response)
+    try:
+        content = b''.join(body)
+    finally:
+        body.close()
+    return response_headers, content
+
+
+def describe(headers, content):
+    encoding = ' gzip' if headers.get('Content-Encoding') == 'gzip' else ''
+    return f'{headers["status"][:3]}, {len(content)} байт{encoding}'
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает накладные расходы стека middleware: старый стек с панелью отладки, текущий без метрик и текущий'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def measure(self, handlers, url, requests_count, headers):
+        timings = {name: [] for name in handlers}
+        responses = {}
+        # Стеки чередуются запрос за запросом, чтобы фоновый шум делился между ними поровну
+        for number in range(50 + requests_count):
+            for name, handler in handlers.items():
+                started_at = time.perf_counter()
+                responses[name] = request(handler, url, headers)
+                if number >= 50:
+                    timings[name].append(time.perf_counter() - started_at)
+        for name in handlers:
+            self.stdout.write(
+                f'  {name:>18}: медиана {statistics.median(timings[name]) * 1_000_000:.0f} мкс, '
+                f'{describe(*responses[name])}'
+            )
+        return responses
+
+    def handle(self, *args, **options):
+        if settings.DEBUG:
+            self.stderr.write('Запустите с DEBUG=False, иначе сравнение не про прод')
+
+        handlers = {}
+        stacks = [
+            ('старый стек', LEGACY_MIDDLEWARE),
+            ('без метрик', [path for path in settings.MIDDLEWARE if path != METRICS_MIDDLEWARE]),
+            ('текущие настройки', settings.MIDDLEWARE),
+        ]
+        for name, middleware in stacks:
+            with override_settings(MIDDLEWARE=middleware):
+                handlers[name] = WSGIHandler()
+
+        for url in URLS:
+            self.stdout.write(url)
+            responses = self.measure(handlers, url, options['requests'], {})
+            etag = responses['текущие настройки'][0].get('ETag')
+            if etag:
+                self.stdout.write(f'{url} с If-None-Match')
+                self.measure(handlers, url, options['requests'], {'HTTP_IF_NONE_MATCH': etag})
@@ -0,0 +1,79 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from foodcartapp.models import Order, OrderItem, Product
+
+
+def totals_in_python(orders):
+    return {
+        order.pk: sum(item.price * item.quantity for item in order.items.all())
+        for order in orders.prefetch_related('items')
+    }
+
+
+def totals_annotated(orders):
+    return dict(orders.with_total().values_list('pk', 'total_cost'))
+
+
+def totals_denormalized(orders):
+    return dict(orders.values_list('pk', 'total'))
+
+
+def create_orders(orders_count, items_per_order):
+    products = Product.objects.bulk_create(
+        Product(name=f'Бургер {number}', price=f'{100 + number}.00', image=f'burger_{number}.jpg')
+        for number in range(50)
+    )
+    orders = Order.objects.bulk_create(
+        (
+            Order(firstname='Иван', lastname=f'Петров {number}', phonenumber='+79990000000', address='Москва')
+            for number in range(orders_count)
+        ),
+        batch_size=1000,
+    )
+    OrderItem.objects.bulk_create(
+        (
+            OrderItem(order=order, product=product, quantity=random.randint(1, 5), price=product.price)
+            for order in orders
+            for product in random.sample(products, k=items_per_order)
+        ),
+        batch_size=5000,
+    )
+    Order.objects.filter(pk__in=[order.pk for order in orders]).recalculate_totals()
+    return orders
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает подсчёт стоимости заказов в Python, аннотацией в SQL и по денормализованной колонке'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--items-per-order', type=int, default=4)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        # Тестовые заказы живут только внутри транзакции и откатываются
+        with transaction.atomic():
+            orders = create_orders(options['orders'], options['items_per_order'])
+            orders = Order.objects.filter(pk__in=[order.pk for order in orders])
+
+            reference = None
+            for name, get_totals in [
+                ('цикл в Python', totals_in_python),
+                ('with_total()', totals_annotated),
+                ('колонка total', totals_denormalized),
+            ]:
+                timings = []
+                for _ in range(options['repeat']):
+                    with CaptureQueriesContext(connection) as queries:
+                        started_at = time.perf_counter()
+                        totals = get_totals(orders)
+                        timings.append(time.perf_counter() - started_at)
+                reference = reference or totals
+                assert totals == reference, f'{name}: суммы не совпали'
+                self.stdout.write(f'{name:<16} {min(timings) * 1000:9.1f} мс  запросов: {len(queries)}')
+            transaction.set_rollback(True)
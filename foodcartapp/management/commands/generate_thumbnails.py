@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.catalog_cache import invalidate_catalog
+from foodcartapp.models import Product
+from foodcartapp.thumbnails import THUMBNAIL_SIZES, ensure_thumbnails, make_thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для картинок товаров, у которых их ещё нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='пересоздать и существующие миниатюры')
+
+    def handle(self, *args, **options):
+        storage = Product._meta.get_field('image').storage
+        image_names = (
+            Product.objects
+            .exclude(image='')
+            .order_by()
+            .values_list('image', flat=True)
+            .distinct()
+        )
+
+        started_at = time.monotonic()
+        images_count = 0
+        # Имена забираем целиком: SQLite не изолирует незакрытый курсор от update() по той же таблице
+        for image_name in list(image_names):
+            if options['force']:
+                has_thumbnails = self.remake_thumbnails(storage, image_name)
+            else:
+                has_thumbnails = ensure_thumbnails(storage, image_name)
+            Product.objects.filter(image=image_name).update(has_thumbnails=has_thumbnails)
+            images_count += 1
+        # update() не шлёт сигналов, а в закэшированном каталоге могли остаться адреса оригиналов
+        invalidate_catalog()
+
+        elapsed = time.monotonic() - started_at
+        self.stdout.write(self.style.SUCCESS(f'Обработано картинок: {images_count} за {elapsed:.2f} с'))
+
+    def remake_thumbnails(self, storage, image_name):
+        has_thumbnails = True
+        for size in THUMBNAIL_SIZES:
+            try:
+                make_thumbnail(storage, image_name, size)
+            except OSError as error:
+                self.stderr.write(f'{image_name}: {error}')
+                has_thumbnails = False
+        return has_thumbnails
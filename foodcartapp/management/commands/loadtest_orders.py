@@ -0,0 +1,82 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+
+from foodcartapp.models import Order, Product
+
+
+def make_payload(product_ids, number):
+    return {
+        'products': [
+            {'product': product_id, 'quantity': random.randint(1, 3)}
+            for product_id in random.sample(product_ids, k=min(len(product_ids), 3))
+        ],
+        'firstname': 'Нагрузочный',
+        'lastname': f'Тест {number}',
+        'phonenumber': '+79990000000',
+        'address': 'Москва, Красная площадь, 1',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Отправляет заказы в /api/order/ из нескольких потоков и считает заказы в секунду'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--keep', action='store_true', help='не удалять созданные заказы')
+
+    def send_orders(self, product_ids, numbers):
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        latencies = []
+        created_ids = []
+        try:
+            for number in numbers:
+                started_at = time.perf_counter()
+                response = client.post(
+                    '/api/order/',
+                    json.dumps(make_payload(product_ids, number)),
+                    content_type='application/json',
+                )
+                latencies.append(time.perf_counter() - started_at)
+                if response.status_code in (201, 202):
+                    created_ids.append(response.json()['id'])
+        finally:
+            connections.close_all()
+        return latencies, created_ids
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.available().values_list('pk', flat=True)[:100])
+        if not product_ids:
+            raise CommandError('Нет доступных товаров: добавьте товары в меню ресторанов')
+
+        concurrency = options['concurrency']
+        numbers = range(options['orders'])
+        batches = [numbers[worker::concurrency] for worker in range(concurrency)]
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda batch: self.send_orders(product_ids, batch), batches))
+        elapsed = time.perf_counter() - started_at
+
+        latencies = sorted(latency for batch_latencies, _ in results for latency in batch_latencies)
+        created_ids = [order_id for _, batch_ids in results for order_id in batch_ids]
+
+        self.stdout.write(f'Создано заказов: {len(created_ids)} из {len(latencies)} за {elapsed:.2f} с')
+        self.stdout.write(f'Пропускная способность: {len(created_ids) / elapsed:.1f} заказов/с')
+        self.stdout.write(
+            'Задержка, мс: p50 {:.1f}, p95 {:.1f}, max {:.1f}'.format(
+                latencies[len(latencies) // 2] * 1000,
+                latencies[int(len(latencies) * 0.95)] * 1000,
+                latencies[-1] * 1000,
+            )
+        )
+
+        if not options['keep']:
+            Order.objects.filter(pk__in=created_ids).delete()
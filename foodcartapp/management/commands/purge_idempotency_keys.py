@@ -0,0 +1,15 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Удаляет просроченные ключи идемпотентности. Запускайте по крону, например раз в час'
+
+    def handle(self, *args, **options):
+        ttl = timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        deleted, _ = IdempotencyKey.objects.expired(ttl).delete()
+        self.stdout.write(f'Удалено ключей: {deleted}')
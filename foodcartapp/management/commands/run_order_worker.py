@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+
+from foodcartapp.models import OrderIntakeTask
+from foodcartapp.orders import process_intake_tasks
+
+
+class Command(BaseCommand):
+    help = 'Фоновый воркер: достаёт заказы из очереди, фиксирует цены и создаёт позиции заказов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--poll-interval', type=float, default=0.5, help='пауза, когда очередь пуста, с')
+        parser.add_argument('--report-interval', type=float, default=10, help='как часто печатать метрики, с')
+        parser.add_argument('--once', action='store_true', help='разобрать очередь и выйти')
+
+    def report(self, processed, failed, max_lag, elapsed):
+        oldest_pending = OrderIntakeTask.objects.pending().aggregate(oldest=Min('created_at'))['oldest']
+        backlog_age = (timezone.now() - oldest_pending).total_seconds() if oldest_pending else 0
+        self.stdout.write(
+            f'обработано: {processed} ({processed / elapsed:.1f} заказов/с), ошибок: {failed}, '
+            f'макс. задержка: {max_lag:.2f} с, возраст очереди: {backlog_age:.2f} с'
+        )
+
+    def handle(self, *args, **options):
+        processed = failed = 0
+        max_lag = 0
+        window_started_at = time.monotonic()
+
+        while True:
+            tasks = process_intake_tasks(options['batch_size'])
+            processed += len(tasks)
+            failed += sum(1 for task in tasks if task.error)
+            for task in tasks:
+                max_lag = max(max_lag, (task.processed_at - task.created_at).total_seconds())
+
+            elapsed = time.monotonic() - window_started_at
+            if options['once'] and not tasks:
+                self.report(processed, failed, max_lag, elapsed)
+                return
+            if elapsed >= options['report_interval']:
+                self.report(processed, failed, max_lag, elapsed)
+                processed = failed = 0
+                max_lag = 0
+                window_started_at = time.monotonic()
+            if not tasks:
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,59 @@
+from collections import defaultdict
+
+from .models import RestaurantMenuItem
+
+
+class RestaurantMatcher:
+    """Подбирает рестораны, которые могут приготовить заказ целиком.
+
+    Для каждого товара хранится битовая маска ресторанов, где он в продаже.
+    Рестораны для заказа — пересечение масок всех его товаров.
+    """
+
+    def __init__(self, menu):
+        self.restaurant_ids = sorted({restaurant_id for restaurant_id, _ in menu})
+        bits = {restaurant_id: 1 << index for index, restaurant_id in enumerate(self.restaurant_ids)}
+
+        self.product_masks = defaultdict(int)
+        for restaurant_id, product_id in menu:
+            self.product_masks[product_id] |= bits[restaurant_id]
+
+    @classmethod
+    def load(cls):
+        menu = (
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .values_list('restaurant_id', 'product_id')
+        )
+        return cls(list(menu))
+
+    def get_mask(self, product_ids):
+        if not product_ids:
+            return 0
+        mask = (1 << len(self.restaurant_ids)) - 1
+        for product_id in product_ids:
+            mask &= self.product_masks.get(product_id, 0)
+            if not mask:
+                break
+        return mask
+
+    def unpack_indices(self, mask):
+        indices = []
+        while mask:
+            lowest_bit = mask & -mask
+            indices.append(lowest_bit.bit_length() - 1)
+            mask ^= lowest_bit
+        return indices
+
+    def unpack(self, mask):
+        return [self.restaurant_ids[index] for index in self.unpack_indices(mask)]
+
+    def match(self, product_ids):
+        return self.unpack(self.get_mask(product_ids))
+
+    def match_orders(self, orders_products):
+        """Принимает {id заказа: id товаров}, возвращает {id заказа: id ресторанов}."""
+        return {
+            order_id: self.match(product_ids)
+            for order_id, product_ids in orders_products.items()
+        }
@@ -0,0 +1,34 @@
+from django.db import transaction
+
+from .models import RestaurantMenuItem
+from .signals import menu_availability_changed
+
+
+def set_availability(available, product_ids=None, restaurant_ids=None, batch_size=500):
+    """Включает или снимает с продажи товары в ресторанах, возвращает число изменённых строк.
+
+    None вместо списка id означает «все». Строки меняются пачками через update(),
+    без сигналов на каждую строку, а кэши сбрасываются одним событием в конце.
+    """
+    menu_items = RestaurantMenuItem.objects.exclude(availability=available)
+    if restaurant_ids is not None:
+        menu_items = menu_items.filter(restaurant_id__in=restaurant_ids)
+
+    updated = 0
+    with transaction.atomic():
+        if product_ids is None:
+            updated = menu_items.update(availability=available)
+        else:
+            product_ids = list(product_ids)
+            for start in range(0, len(product_ids), batch_size):
+                batch = product_ids[start:start + batch_size]
+                updated += menu_items.filter(product_id__in=batch).update(availability=available)
+
+        if updated:
+            menu_availability_changed.send(
+                sender=RestaurantMenuItem,
+                available=available,
+                product_ids=product_ids,
+                restaurant_ids=restaurant_ids,
+            )
+    return updated
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0037_auto_20210125_1833'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='restaurantmenuitem',
+            index=models.Index(fields=['product', 'availability'], name='menu_item_product_avail_idx'),
+        ),
+    ]
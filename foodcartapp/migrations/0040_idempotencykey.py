@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0039_order_orderitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='хэш ключа')),
+                ('request_hash', models.CharField(blank=True, max_length=64, verbose_name='хэш тела запроса')),
+                ('status_code', models.PositiveSmallIntegerField(null=True, verbose_name='код ответа')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='тип ответа')),
+                ('content', models.BinaryField(default=bytes, verbose_name='тело ответа')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='создан')),
+            ],
+            options={
+                'verbose_name': 'ключ идемпотентности',
+                'verbose_name_plural': 'ключи идемпотентности',
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:03
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0040_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderIntakeTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('products', models.JSONField(help_text='список пар [id товара, количество] из формы заказа', verbose_name='товары')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='поставлена в очередь')),
+                ('processed_at', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='обработана')),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='intake_task', to='foodcartapp.order', verbose_name='заказ')),
+            ],
+            options={
+                'verbose_name': 'задача приёма заказа',
+                'verbose_name_plural': 'задачи приёма заказов',
+            },
+        ),
+    ]
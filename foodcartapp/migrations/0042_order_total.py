@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:03
+
+from decimal import Decimal
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_order_totals(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderItem = apps.get_model('foodcartapp', 'OrderItem')
+    item_totals = (
+        OrderItem.objects
+        .filter(order=models.OuterRef('pk'))
+        .values('order')
+        .annotate(total=models.Sum(models.F('quantity') * models.F('price')))
+        .values('total')
+    )
+    Order.objects.update(
+        total=Coalesce(
+            models.Subquery(item_totals, output_field=models.DecimalField(max_digits=10, decimal_places=2)),
+            Decimal(0),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0041_orderintaketask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='сумма по позициям заказа, пересчитывается при их изменении', max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='стоимость'),
+        ),
+        migrations.RunPython(fill_order_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0042_order_total'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('new', 'Новый'), ('confirmed', 'Подтверждён'), ('cooking', 'Готовится'), ('delivering', 'Доставляется'), ('done', 'Выполнен')], default='new', max_length=20, verbose_name='статус'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='is_unprocessed',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('status__in', ['new', 'confirmed', 'cooking', 'delivering'])), output_field=models.BooleanField(verbose_name='необработан')),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('is_unprocessed', True)), fields=['created_at'], name='order_unprocessed_idx'),
+        ),
+    ]
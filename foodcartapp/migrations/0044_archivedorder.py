@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0043_order_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.IntegerField(db_index=True, verbose_name='id заказа')),
+                ('firstname', models.CharField(max_length=50, verbose_name='имя')),
+                ('lastname', models.CharField(max_length=50, verbose_name='фамилия')),
+                ('phonenumber', models.CharField(db_index=True, max_length=20, verbose_name='телефон')),
+                ('address', models.CharField(max_length=200, verbose_name='адрес')),
+                ('created_at', models.DateTimeField(db_index=True, verbose_name='создан')),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='стоимость')),
+                ('status', models.CharField(choices=[('new', 'Новый'), ('confirmed', 'Подтверждён'), ('cooking', 'Готовится'), ('delivering', 'Доставляется'), ('done', 'Выполнен')], max_length=20, verbose_name='статус')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='перенесён в архив')),
+            ],
+            options={
+                'verbose_name': 'архивный заказ',
+                'verbose_name_plural': 'архивные заказы',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='количество')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='цена')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='foodcartapp.archivedorder', verbose_name='заказ')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_order_items', to='foodcartapp.product', verbose_name='товар')),
+            ],
+            options={
+                'verbose_name': 'элемент архивного заказа',
+                'verbose_name_plural': 'элементы архивных заказов',
+            },
+        ),
+    ]
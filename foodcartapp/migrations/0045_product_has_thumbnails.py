@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0044_archivedorder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='has_thumbnails',
+            field=models.BooleanField(default=False, editable=False, verbose_name='миниатюры готовы'),
+        ),
+    ]
@@ -1,5 +1,9 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 
 class Restaurant(models.Model):
@@ -27,13 +31,23 @@ class Restaurant(models.Model):
 
 
 class ProductQuerySet(models.QuerySet):
-    def available(self):
-        products = (
-            RestaurantMenuItem.objects
-            .filter(availability=True)
-            .values_list('product')
+    def available(self, restaurants=None):
+        menu_items = RestaurantMenuItem.objects.filter(
+            product=models.OuterRef('pk'),
+            availability=True,
         )
-        return self.filter(pk__in=products)
+        if restaurants is not None:
+            menu_items = menu_items.filter(restaurant__in=restaurants)
+        return self.filter(models.Exists(menu_items))
+
+    def special(self):
+        return self.filter(special_status=True)
+
+    def in_category(self, category_id):
+        return self.filter(category_id=category_id)
+
+    def after(self, last_id):
+        return self.filter(pk__gt=last_id).order_by('pk')
 
 
 class ProductCategory(models.Model):
@@ -72,6 +86,11 @@ class Product(models.Model):
     image = models.ImageField(
         'картинка'
     )
+    has_thumbnails = models.BooleanField(
+        'миниатюры готовы',
+        default=False,
+        editable=False,
+    )
     special_status = models.BooleanField(
         'спец.предложение',
         default=False,
@@ -118,6 +137,340 @@ class RestaurantMenuItem(models.Model):
         unique_together = [
             ['restaurant', 'product']
         ]
+        indexes = [
+            models.Index(fields=['product', 'availability'], name='menu_item_product_avail_idx'),
+        ]
 
     def __str__(self):
         return f"{self.restaurant.name} - {self.product.name}"
+
+
+class OrderStatus(models.TextChoices):
+    NEW = 'new', 'Новый'
+    CONFIRMED = 'confirmed', 'Подтверждён'
+    COOKING = 'cooking', 'Готовится'
+    DELIVERING = 'delivering', 'Доставляется'
+    DONE = 'done', 'Выполнен'
+
+
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatus.NEW: [OrderStatus.CONFIRMED],
+    OrderStatus.CONFIRMED: [OrderStatus.COOKING],
+    OrderStatus.COOKING: [OrderStatus.DELIVERING],
+    OrderStatus.DELIVERING: [OrderStatus.DONE],
+    OrderStatus.DONE: [],
+}
+
+UNPROCESSED_ORDER_STATUSES = [
+    OrderStatus.NEW,
+    OrderStatus.CONFIRMED,
+    OrderStatus.COOKING,
+    OrderStatus.DELIVERING,
+]
+
+
+class InvalidStatusTransition(Exception):
+    pass
+
+
+class OrderQuerySet(models.QuerySet):
+    def unprocessed(self):
+        # Фильтр по вычисляемой колонке без параметров, иначе SQLite не узнаёт в нём условие частичного индекса
+        return self.filter(is_unprocessed=True)
+
+    def with_total(self):
+        return self.annotate(
+            total_cost=models.Sum(
+                models.F('items__quantity') * models.F('items__price'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2),
+            )
+        )
+
+    def recalculate_totals(self):
+        item_totals = (
+            OrderItem.objects
+            .filter(order=models.OuterRef('pk'))
+            .values('order')
+            .annotate(total=models.Sum(models.F('quantity') * models.F('price')))
+            .values('total')
+        )
+        return self.update(
+            total=Coalesce(
+                models.Subquery(item_totals, output_field=models.DecimalField(max_digits=10, decimal_places=2)),
+                Decimal(0),
+            )
+        )
+
+
+class Order(models.Model):
+    firstname = models.CharField(
+        'имя',
+        max_length=50,
+    )
+    lastname = models.CharField(
+        'фамилия',
+        max_length=50,
+    )
+    phonenumber = models.CharField(
+        'телефон',
+        max_length=20,
+        db_index=True,
+    )
+    address = models.CharField(
+        'адрес',
+        max_length=200,
+    )
+    created_at = models.DateTimeField(
+        'создан',
+        default=timezone.now,
+        db_index=True,
+    )
+    total = models.DecimalField(
+        'стоимость',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        validators=[MinValueValidator(0)],
+        help_text='сумма по позициям заказа, пересчитывается при их изменении',
+    )
+    status = models.CharField(
+        'статус',
+        max_length=20,
+        choices=OrderStatus.choices,
+        default=OrderStatus.NEW,
+    )
+    is_unprocessed = models.GeneratedField(
+        expression=models.Q(status__in=UNPROCESSED_ORDER_STATUSES),
+        output_field=models.BooleanField('необработан'),
+        db_persist=True,
+    )
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'заказ'
+        verbose_name_plural = 'заказы'
+        indexes = [
+            # Необработанных заказов мало по сравнению со всей историей, индексируем только их
+            models.Index(
+                fields=['created_at'],
+                name='order_unprocessed_idx',
+                condition=models.Q(is_unprocessed=True),
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.firstname} {self.lastname}, {self.address}"
+
+    def can_change_status(self, status):
+        return status in ORDER_STATUS_TRANSITIONS[self.status]
+
+    def change_status(self, status):
+        if not self.can_change_status(status):
+            raise InvalidStatusTransition(f'Заказ нельзя перевести из «{self.get_status_display()}» в «{OrderStatus(status).label}»')
+        # Условие на старый статус защищает от гонки двух менеджеров
+        updated = Order.objects.filter(pk=self.pk, status=self.status).update(status=status)
+        if not updated:
+            raise InvalidStatusTransition('Статус заказа уже изменили')
+        self.status = status
+
+
+class OrderItem(models.Model):
+    order = models.ForeignKey(
+        Order,
+        related_name='items',
+        verbose_name='заказ',
+        on_delete=models.CASCADE,
+    )
+    product = models.ForeignKey(
+        Product,
+        related_name='order_items',
+        verbose_name='товар',
+        on_delete=models.PROTECT,
+    )
+    quantity = models.PositiveIntegerField(
+        'количество',
+        validators=[MinValueValidator(1)],
+    )
+    price = models.DecimalField(
+        'цена',
+        max_digits=8,
+        decimal_places=2,
+        validators=[MinValueValidator(0)],
+    )
+
+    class Meta:
+        verbose_name = 'элемент заказа'
+        verbose_name_plural = 'элементы заказа'
+
+    def __str__(self):
+        return f"{self.product_id} × {self.quantity}"
+
+
+class ArchivedOrder(models.Model):
+    # Свой первичный ключ, а не id заказа: номер может повториться, если id выдадут заново
+    order_id = models.IntegerField(
+        'id заказа',
+        db_index=True,
+    )
+    firstname = models.CharField(
+        'имя',
+        max_length=50,
+    )
+    lastname = models.CharField(
+        'фамилия',
+        max_length=50,
+    )
+    phonenumber = models.CharField(
+        'телефон',
+        max_length=20,
+        db_index=True,
+    )
+    address = models.CharField(
+        'адрес',
+        max_length=200,
+    )
+    created_at = models.DateTimeField(
+        'создан',
+        db_index=True,
+    )
+    total = models.DecimalField(
+        'стоимость',
+        max_digits=10,
+        decimal_places=2,
+    )
+    status = models.CharField(
+        'статус',
+        max_length=20,
+        choices=OrderStatus.choices,
+    )
+    archived_at = models.DateTimeField(
+        'перенесён в архив',
+        default=timezone.now,
+    )
+
+    class Meta:
+        verbose_name = 'архивный заказ'
+        verbose_name_plural = 'архивные заказы'
+
+    def __str__(self):
+        return f"{self.firstname} {self.lastname}, {self.address}"
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(
+        ArchivedOrder,
+        related_name='items',
+        verbose_name='заказ',
+        on_delete=models.CASCADE,
+    )
+    product = models.ForeignKey(
+        Product,
+        related_name='archived_order_items',
+        verbose_name='товар',
+        on_delete=models.PROTECT,
+    )
+    quantity = models.PositiveIntegerField(
+        'количество',
+    )
+    price = models.DecimalField(
+        'цена',
+        max_digits=8,
+        decimal_places=2,
+    )
+
+    class Meta:
+        verbose_name = 'элемент архивного заказа'
+        verbose_name_plural = 'элементы архивных заказов'
+
+    def __str__(self):
+        return f"{self.product_id} × {self.quantity}"
+
+
+class OrderIntakeTaskQuerySet(models.QuerySet):
+    def pending(self):
+        return self.filter(processed_at__isnull=True)
+
+
+class OrderIntakeTask(models.Model):
+    order = models.OneToOneField(
+        Order,
+        related_name='intake_task',
+        verbose_name='заказ',
+        on_delete=models.CASCADE,
+    )
+    products = models.JSONField(
+        'товары',
+        help_text='список пар [id товара, количество] из формы заказа',
+    )
+    created_at = models.DateTimeField(
+        'поставлена в очередь',
+        default=timezone.now,
+    )
+    processed_at = models.DateTimeField(
+        'обработана',
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+    error = models.TextField(
+        'ошибка',
+        blank=True,
+    )
+
+    objects = OrderIntakeTaskQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'задача приёма заказа'
+        verbose_name_plural = 'задачи приёма заказов'
+
+    def __str__(self):
+        return f"Задача для заказа {self.order_id}"
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    def expired(self, ttl):
+        return self.filter(created_at__lt=timezone.now() - ttl)
+
+    def fresh(self, ttl):
+        return self.filter(created_at__gte=timezone.now() - ttl)
+
+
+class IdempotencyKey(models.Model):
+    key = models.CharField(
+        'хэш ключа',
+        max_length=64,
+        unique=True,
+    )
+    request_hash = models.CharField(
+        'хэш тела запроса',
+        max_length=64,
+        blank=True,
+    )
+    status_code = models.PositiveSmallIntegerField(
+        'код ответа',
+        null=True,
+    )
+    content_type = models.CharField(
+        'тип ответа',
+        max_length=100,
+        blank=True,
+    )
+    content = models.BinaryField(
+        'тело ответа',
+        default=bytes,
+    )
+    created_at = models.DateTimeField(
+        'создан',
+        default=timezone.now,
+        db_index=True,
+    )
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'ключ идемпотентности'
+        verbose_name_plural = 'ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
@@ -0,0 +1,99 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Order, OrderIntakeTask, OrderItem, Product
+
+
+class UnknownProductsError(Exception):
+    def __init__(self, product_ids):
+        super().__init__(f'Неизвестные товары: {", ".join(map(str, sorted(product_ids)))}')
+        self.product_ids = product_ids
+
+
+def fetch_prices(product_ids):
+    # Цены всех товаров достаём одним запросом
+    return Product.objects.only('price').in_bulk(product_ids)
+
+
+def build_order_items(order, products, prices):
+    unknown_product_ids = {product_id for product_id, _ in products} - prices.keys()
+    if unknown_product_ids:
+        raise UnknownProductsError(unknown_product_ids)
+    return [
+        OrderItem(
+            order=order,
+            product_id=product_id,
+            quantity=quantity,
+            price=prices[product_id].price,
+        )
+        for product_id, quantity in products
+    ]
+
+
+def get_items_total(items):
+    return sum((item.price * item.quantity for item in items), Decimal(0))
+
+
+def create_order(firstname, lastname, phonenumber, address, products):
+    prices = fetch_prices({product_id for product_id, _ in products})
+    order = Order(
+        firstname=firstname,
+        lastname=lastname,
+        phonenumber=phonenumber,
+        address=address,
+    )
+    items = build_order_items(order, products, prices)
+    order.total = get_items_total(items)
+
+    with transaction.atomic():
+        order.save()
+        OrderItem.objects.bulk_create(items)
+    return order
+
+
+def enqueue_order(firstname, lastname, phonenumber, address, products):
+    with transaction.atomic():
+        order = Order.objects.create(
+            firstname=firstname,
+            lastname=lastname,
+            phonenumber=phonenumber,
+            address=address,
+        )
+        OrderIntakeTask.objects.create(order=order, products=products)
+    return order
+
+
+def process_intake_tasks(batch_size=100):
+    """Разбирает пачку задач из очереди и возвращает их список."""
+    with transaction.atomic():
+        # skip_locked позволяет нескольким воркерам разбирать очередь, не мешая друг другу.
+        # Блокируем только задачи: строки заказов из select_related нужны сайту и менеджерам
+        tasks = list(
+            OrderIntakeTask.objects
+            .pending()
+            .select_for_update(skip_locked=True, of=('self',))
+            .select_related('order')
+            .order_by('pk')[:batch_size]
+        )
+        if not tasks:
+            return []
+
+        prices = fetch_prices({product_id for task in tasks for product_id, _ in task.products})
+        items = []
+        processed_at = timezone.now()
+        for task in tasks:
+            try:
+                order_items = build_order_items(task.order, task.products, prices)
+            except UnknownProductsError as error:
+                task.error = str(error)
+            else:
+                task.order.total = get_items_total(order_items)
+                items.extend(order_items)
+            task.processed_at = processed_at
+
+        OrderItem.objects.bulk_create(items)
+        Order.objects.bulk_update([task.order for task in tasks], ['total'])
+        OrderIntakeTask.objects.bulk_update(tasks, ['processed_at', 'error'])
+    return tasks
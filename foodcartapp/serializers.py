@@ -0,0 +1,134 @@
+import json
+from itertools import islice
+
+from .models import Product
+from .thumbnails import LARGE_THUMBNAIL_SIZE, get_thumbnail_url
+
+
+PRODUCT_VALUES = [
+    'id',
+    'name',
+    'price',
+    'special_status',
+    'description',
+    'image',
+    'has_thumbnails',
+    'category_id',
+    'category__name',
+]
+
+
+def serialize_product(row, image_storage):
+    return {
+        'id': row['id'],
+        'name': row['name'],
+        'price': str(row['price']),
+        'special_status': row['special_status'],
+        'description': row['description'],
+        'category': {
+            'id': row['category_id'],
+            'name': row['category__name'],
+        } if row['category_id'] else None,
+        'image': image_storage.url(row['image']) if row['image'] else None,
+        'thumbnail': (
+            get_thumbnail_url(image_storage, row['image'], LARGE_THUMBNAIL_SIZE, row['has_thumbnails'])
+            if row['image'] else None
+        ),
+        'restaurant': {
+            'id': row['id'],
+            'name': row['name'],
+        }
+    }
+
+
+# Поле ответа -> (нужные колонки, как получить значение из строки .values())
+PRODUCT_FIELDS = {
+    'id': (['id'], lambda row, storage: row['id']),
+    'name': (['name'], lambda row, storage: row['name']),
+    'price': (['price'], lambda row, storage: str(row['price'])),
+    'special_status': (['special_status'], lambda row, storage: row['special_status']),
+    'description': (['description'], lambda row, storage: row['description']),
+    'category': (
+        ['category_id', 'category__name'],
+        lambda row, storage: {
+            'id': row['category_id'],
+            'name': row['category__name'],
+        } if row['category_id'] else None,
+    ),
+    'image': (['image'], lambda row, storage: storage.url(row['image']) if row['image'] else None),
+    'thumbnail': (
+        ['image', 'has_thumbnails'],
+        lambda row, storage: (
+            get_thumbnail_url(storage, row['image'], LARGE_THUMBNAIL_SIZE, row['has_thumbnails'])
+            if row['image'] else None
+        ),
+    ),
+    'restaurant': (
+        ['id', 'name'],
+        lambda row, storage: {
+            'id': row['id'],
+            'name': row['name'],
+        },
+    ),
+}
+
+
+def get_product_rows(products, fields=None):
+    if not fields:
+        return products.values(*PRODUCT_VALUES)
+    # id нужен всегда: по нему строится курсор следующей страницы
+    columns = {'id'} | {column for field in fields for column in PRODUCT_FIELDS[field][0]}
+    return products.values(*columns)
+
+
+def serialize_product_rows(rows, fields=None):
+    image_storage = Product._meta.get_field('image').storage
+    if not fields:
+        return [serialize_product(row, image_storage) for row in rows]
+
+    getters = [(field, PRODUCT_FIELDS[field][1]) for field in fields]
+    return [
+        {field: getter(row, image_storage) for field, getter in getters}
+        for row in rows
+    ]
+
+
+def serialize_products(products, fields=None):
+    return serialize_product_rows(get_product_rows(products, fields), fields)
+
+
+def iter_products_json(products, fields=None, chunk_size=2000):
+    rows = get_product_rows(products, fields).iterator(chunk_size=chunk_size)
+    yield b'['
+    separator = b''
+    while chunk := list(islice(rows, chunk_size)):
+        # Сериализуем пачку как список и отрезаем квадратные скобки
+        yield separator + dump_json(serialize_product_rows(chunk, fields))[1:-1]
+        separator = b','
+    yield b']'
+
+
+async def aiter_products_json(products, fields=None, chunk_size=2000):
+    # Асинхронная версия iter_products_json: пока база отдаёт строки, цикл событий обслуживает других клиентов
+    yield b'['
+    separator = b''
+    chunk = []
+    async for row in get_product_rows(products, fields).aiterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) < chunk_size:
+            continue
+        yield separator + dump_json(serialize_product_rows(chunk, fields))[1:-1]
+        separator = b','
+        chunk = []
+    if chunk:
+        yield separator + dump_json(serialize_product_rows(chunk, fields))[1:-1]
+    yield b']'
+
+
+def dump_json(data, pretty=False):
+    if pretty:
+        content = json.dumps(data, ensure_ascii=False, indent=4)
+    else:
+        # Без отступов json использует быстрый кодировщик на C
+        content = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    return content.encode('utf-8')
@@ -0,0 +1,73 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from .availability import reset_availability, update_availability
+from .catalog_cache import invalidate_catalog
+from .models import Product, ProductCategory, RestaurantMenuItem
+from .thumbnails import ensure_thumbnails
+
+
+# Массовое изменение меню: одно событие на всю пачку вместо сигнала на каждую строку
+menu_availability_changed = Signal()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def invalidate_catalog_on_change(sender, **kwargs):
+    # Сбрасываем версию после коммита, иначе другой воркер успеет закэшировать старые данные
+    transaction.on_commit(invalidate_catalog)
+
+
+def make_thumbnails(image_field):
+    has_thumbnails = ensure_thumbnails(image_field.storage, image_field.name)
+    # По флагу API решает, отдавать миниатюру или оригинал. Картинка может быть общей у нескольких товаров
+    Product.objects.filter(image=image_field.name).update(has_thumbnails=has_thumbnails)
+    # Каталог мог успеть закэшироваться с адресом оригинала вместо миниатюры
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=Product)
+def make_thumbnails_on_save(sender, instance, **kwargs):
+    if instance.image:
+        transaction.on_commit(partial(make_thumbnails, instance.image))
+
+
+@receiver(pre_save, sender=RestaurantMenuItem)
+def remember_previous_cell(sender, instance, **kwargs):
+    # В админке у строки меню можно сменить товар или ресторан, тогда прежнюю клетку матрицы надо погасить
+    instance.previous_cell = None
+    if instance.pk:
+        instance.previous_cell = (
+            RestaurantMenuItem.objects
+            .filter(pk=instance.pk)
+            .values_list('product_id', 'restaurant_id')
+            .first()
+        )
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+def update_availability_on_save(sender, instance, **kwargs):
+    cell = (instance.product_id, instance.restaurant_id)
+    changes = [(*cell, instance.availability)]
+    if instance.previous_cell and instance.previous_cell != cell:
+        changes.insert(0, (*instance.previous_cell, False))
+    transaction.on_commit(partial(update_availability, changes))
+
+
+@receiver(post_delete, sender=RestaurantMenuItem)
+def update_availability_on_delete(sender, instance, **kwargs):
+    change = (instance.product_id, instance.restaurant_id, False)
+    transaction.on_commit(partial(update_availability, [change]))
+
+
+@receiver(menu_availability_changed)
+def reset_caches_on_bulk_change(sender, **kwargs):
+    transaction.on_commit(invalidate_catalog)
+    transaction.on_commit(reset_availability)
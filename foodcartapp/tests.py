@@ -0,0 +1,782 @@
+import asyncio
+import json
+from datetime import timedelta
+from decimal import Decimal
+import tempfile
+import threading
+import time
+import tracemalloc
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.forms.models import model_to_dict
+from django.utils import timezone
+from django.http import HttpResponse
+from PIL import Image
+from django.db import connection
+from django.test import (
+    AsyncRequestFactory,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    skipUnlessDBFeature,
+)
+
+from star_burger.metrics import Histogram, Metrics, QueryStats
+from star_burger.middleware import QueryInspectorMiddleware
+from star_burger.testing import QueryBudgetMixin
+
+from . import async_views, orders, views
+from .admin import OrderAdminForm
+from .archive import archive_batch, get_order_history
+from .availability import AvailabilityMatrix, get_availability_matrix, get_cache
+from .catalog_cache import LocalMemoryBackend
+from .forms import decode_cursor, encode_cursor
+from .menu import set_availability
+from .orders import UnknownProductsError, create_order, enqueue_order, process_intake_tasks
+from .models import (
+    ArchivedOrder,
+    IdempotencyKey,
+    IdempotencyKeyQuerySet,
+    InvalidStatusTransition,
+    Order,
+    OrderIntakeTask,
+    OrderItem,
+    OrderStatus,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem,
+)
+from .signals import menu_availability_changed
+
+
+def create_available_products(restaurant, count):
+    products = Product.objects.bulk_create(
+        Product(name=f'Бургер {number}', price='100.00', image=f'burger_{number}.jpg')
+        for number in range(count)
+    )
+    RestaurantMenuItem.objects.bulk_create(
+        RestaurantMenuItem(restaurant=restaurant, product=product)
+        for product in products
+    )
+
+
+class ProductListStreamTest(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name='Star Burger')
+
+    def measure_stream(self, products_count):
+        Product.objects.all().delete()
+        create_available_products(self.restaurant, products_count)
+
+        response = self.client.get('/api/products/', {'stream': 1})
+        tracemalloc.start()
+        try:
+            size = 0
+            for chunk in response.streaming_content:
+                size += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return size, peak
+
+    def test_stream_is_valid_json(self):
+        create_available_products(self.restaurant, 5)
+
+        response = self.client.get('/api/products/', {'stream': 1, 'fields': 'id,name'})
+
+        products = json.loads(b''.join(response.streaming_content))
+        self.assertEqual([product['name'] for product in products], [f'Бургер {number}' for number in range(5)])
+
+    def test_stream_memory_stays_flat(self):
+        small_size, small_peak = self.measure_stream(2000)
+        large_size, large_peak = self.measure_stream(20000)
+
+        self.assertGreater(large_size, small_size * 9)
+        self.assertLess(large_peak, small_peak * 2)
+
+
+class ProductListQueryTest(TestCase):
+    def setUp(self):
+        create_available_products(Restaurant.objects.create(name='Star Burger'), 5)
+        self.product_ids = list(Product.objects.order_by('pk').values_list('pk', flat=True))
+
+    def get_products(self, **params):
+        response = self.client.get('/api/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(42)), 42)
+
+    def test_pages_follow_cursor(self):
+        first_page = self.get_products(limit=2)
+        second_page = self.get_products(limit=2, cursor=first_page['next_cursor'])
+
+        self.assertEqual([product['id'] for product in first_page['results']], self.product_ids[:2])
+        self.assertEqual([product['id'] for product in second_page['results']], self.product_ids[2:4])
+
+    def test_last_page_has_no_next_cursor(self):
+        page = self.get_products(limit=2, cursor=encode_cursor(self.product_ids[2]))
+
+        self.assertEqual([product['id'] for product in page['results']], self.product_ids[3:])
+        self.assertIsNone(page['next_cursor'])
+
+    def test_full_last_page_has_no_next_cursor(self):
+        page = self.get_products(limit=5)
+
+        self.assertEqual(len(page['results']), 5)
+        self.assertIsNone(page['next_cursor'])
+
+    def test_bad_cursor(self):
+        for cursor in ['not a cursor', encode_cursor('burger')]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/products/', {'cursor': cursor})
+
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json()['errors'])
+
+    def test_category_filter(self):
+        category = ProductCategory.objects.create(name='Бургеры')
+        Product.objects.filter(pk__in=self.product_ids[:2]).update(category=category)
+
+        products = self.get_products(category=category.pk)
+
+        self.assertEqual([product['id'] for product in products], self.product_ids[:2])
+        self.assertEqual(products[0]['category'], {'id': category.pk, 'name': 'Бургеры'})
+
+    def test_special_filter(self):
+        Product.objects.filter(pk=self.product_ids[0]).update(special_status=True)
+
+        special_products = self.get_products(special=1)
+        all_products = self.get_products(special=0)
+
+        self.assertEqual([product['id'] for product in special_products], self.product_ids[:1])
+        self.assertEqual([product['id'] for product in all_products], self.product_ids)
+
+    def test_fields(self):
+        products = self.get_products(fields='id,price')
+
+        self.assertEqual(products[0], {'id': self.product_ids[0], 'price': '100.00'})
+
+    def test_unknown_fields(self):
+        response = self.client.get('/api/products/', {'fields': 'id,secret,password'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors']['fields'], ['Неизвестные поля: password, secret'])
+
+
+class AdminQueryBudgetTest(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name='Star Burger')
+        create_available_products(self.restaurant, 30)
+        self.client.force_login(User.objects.create_superuser('admin', password='admin'))
+
+    def test_restaurant_change_page(self):
+        response = self.assertViewWithinQueryBudget(f'/admin/foodcartapp/restaurant/{self.restaurant.pk}/change/', 12)
+        self.assertEqual(response.status_code, 200)
+
+    def test_product_change_page(self):
+        product = Product.objects.first()
+        response = self.assertViewWithinQueryBudget(f'/admin/foodcartapp/product/{product.pk}/change/', 12)
+        self.assertEqual(response.status_code, 200)
+
+    def test_budget_report_groups_repeated_queries(self):
+        with self.assertRaises(AssertionError) as context:
+            with self.assertMaxQueries(3):
+                for product in Product.objects.all()[:5]:
+                    list(product.menu_items.all())
+
+        self.assertIn('5 × SELECT', str(context.exception))
+
+
+@override_settings(QUERY_INSPECTOR_REPEAT_THRESHOLD=5, QUERY_INSPECTOR_SLOW_QUERY_MS=1000)
+class QueryInspectorMiddlewareTest(TestCase):
+    def test_reports_repeated_queries_with_origin(self):
+        restaurant = Restaurant.objects.create(name='Star Burger')
+        create_available_products(restaurant, 10)
+
+        def view(request):
+            # Без select_related каждый пункт меню дочитывает ресторан и товар для __str__
+            return HttpResponse(', '.join(str(item) for item in RestaurantMenuItem.objects.all()))
+
+        middleware = QueryInspectorMiddleware(view)
+        with self.assertLogs('star_burger.query_inspector', 'WARNING') as logs:
+            middleware(RequestFactory().get('/'))
+
+        self.assertEqual(len(logs.records), 2)
+        self.assertIn('10 одинаковых запросов', logs.output[0])
+        self.assertIn('foodcartapp/models.py', logs.output[0])
+
+    def test_batched_bulk_create_is_not_reported(self):
+        def view(request):
+            create_available_products(Restaurant.objects.create(name='Star Burger'), 2000)
+            return HttpResponse()
+
+        middleware = QueryInspectorMiddleware(view)
+        with self.assertNoLogs('star_burger.query_inspector', 'WARNING'):
+            middleware(RequestFactory().get('/'))
+
+
+BANNERS_VIEW = 'foodcartapp:foodcartapp.views.banners_list_api'
+
+
+class RequestMetricsTest(TestCase):
+    def test_histogram_bucket_counts(self):
+        histogram = Histogram((1, 5))
+        for value in [0.5, 1, 3, 10]:
+            histogram.observe(value)
+
+        # Граница корзины входит в неё: le="1" включает 1
+        self.assertEqual(histogram.counts, [2, 1, 1])
+        self.assertEqual(list(histogram.cumulative_counts()), [2, 3, 4])
+        self.assertEqual(histogram.sum, 14.5)
+        self.assertEqual(histogram.count, 4)
+
+    def test_prometheus_output(self):
+        metrics = Metrics(prefix='test')
+        query_stats = QueryStats()
+        query_stats.count = 3
+        metrics.observe('foodcartapp.views.product_list_api', 200, 0.02, query_stats, size=100)
+        metrics.observe('say "hi"', 404, 0.02, QueryStats())
+
+        lines = metrics.as_prometheus().splitlines()
+
+        self.assertIn('# TYPE test_request_duration_seconds histogram', lines)
+        self.assertIn('test_request_duration_seconds_bucket{view="foodcartapp.views.product_list_api",le="0.01"} 0', lines)
+        self.assertIn('test_request_duration_seconds_bucket{view="foodcartapp.views.product_list_api",le="0.025"} 1', lines)
+        self.assertIn('test_request_duration_seconds_bucket{view="foodcartapp.views.product_list_api",le="+Inf"} 1', lines)
+        self.assertIn('test_request_db_queries_sum{view="foodcartapp.views.product_list_api"} 3', lines)
+        self.assertIn('test_response_size_bytes_count{view="say \\"hi\\""} 0', lines)
+        self.assertIn('# TYPE test_responses_total counter', lines)
+        self.assertIn('test_responses_total{view="say \\"hi\\"",status="404"} 1', lines)
+
+    def test_middleware_records_request(self):
+        metrics = Metrics()
+        self.enterContext(mock.patch('star_burger.middleware.metrics', metrics))
+
+        response = self.client.get('/api/banners/')
+
+        histograms = metrics.as_dict()['views'][BANNERS_VIEW]
+        self.assertEqual(histograms['request_duration_seconds']['count'], 1)
+        self.assertEqual(histograms['response_size_bytes']['sum'], len(response.content))
+        self.assertEqual(
+            metrics.as_dict()['responses'],
+            [{'view': BANNERS_VIEW, 'status': 200, 'count': 1}],
+        )
+
+
+class IdempotentOrderTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Бургер', price='100.00', image='burger.jpg')
+        self.order = {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79991234567',
+            'address': 'Москва, Арбат, 1',
+            'products': [{'product': self.product.pk, 'quantity': 2}],
+        }
+
+    def post_order(self, order, key='checkout-1'):
+        return self.client.post(
+            '/api/order/',
+            json.dumps(order),
+            content_type='application/json',
+            headers={'Idempotency-Key': key},
+        )
+
+    def test_resubmit_replays_response(self):
+        first = self.post_order(self.order)
+        second = self.post_order(self.order)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_corrected_resubmit_after_error_creates_order(self):
+        rejected = self.post_order({**self.order, 'phonenumber': 'нет'})
+        accepted = self.post_order(self.order)
+
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(accepted.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', accepted)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_key_reused_with_other_payload(self):
+        self.post_order(self.order)
+
+        response = self.post_order({**self.order, 'address': 'Москва, Тверская, 1'})
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_concurrent_duplicate_replays_committed_response(self):
+        first = self.post_order(self.order)
+        # Дубль проверил ключ до того, как первый запрос закоммитился, и упрётся в уникальный индекс
+        with mock.patch.object(IdempotencyKeyQuerySet, 'fresh', lambda queryset, ttl: queryset.none()):
+            duplicate = self.post_order(self.order)
+
+        self.assertEqual(duplicate.status_code, 201)
+        self.assertEqual(duplicate['Idempotent-Replayed'], 'true')
+        self.assertEqual(duplicate.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+
+class ProductThumbnailTest(TestCase):
+    def setUp(self):
+        media_root = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(self.settings(MEDIA_ROOT=media_root))
+        self.restaurant = Restaurant.objects.create(name='Star Burger')
+
+    def create_product(self, image_name, content=None):
+        if content is None:
+            image = BytesIO()
+            Image.new('RGB', (800, 800)).save(image, 'JPEG')
+            content = image.getvalue()
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product(name='Бургер', price='100.00')
+            product.image.save(image_name, ContentFile(content), save=False)
+            product.save()
+            RestaurantMenuItem.objects.create(restaurant=self.restaurant, product=product)
+        return product
+
+    def get_catalog_product(self):
+        [product] = json.loads(b''.join(self.client.get('/api/products/', {'stream': 1}).streaming_content))
+        return product
+
+    def test_thumbnail_made_on_save(self):
+        self.create_product('burger.jpg')
+
+        product = self.get_catalog_product()
+
+        self.assertTrue(product['thumbnail'].endswith('/thumbnails/burger_400x400.jpg'))
+
+    def test_unreadable_image_falls_back_to_image(self):
+        with self.assertLogs('foodcartapp.thumbnails', 'WARNING'):
+            self.create_product('burger.jpg', content=b'not an image')
+
+        product = self.get_catalog_product()
+
+        self.assertEqual(product['thumbnail'], product['image'])
+
+    def test_catalog_does_not_check_storage(self):
+        self.create_product('burger.jpg')
+
+        with mock.patch('django.core.files.storage.FileSystemStorage.exists', side_effect=AssertionError):
+            product = self.get_catalog_product()
+
+        self.assertTrue(product['thumbnail'].endswith('/thumbnails/burger_400x400.jpg'))
+
+    def test_generate_thumbnails_marks_products(self):
+        product = self.create_product('burger.jpg')
+        Product.objects.update(has_thumbnails=False)
+
+        call_command('generate_thumbnails', stdout=StringIO())
+
+        product.refresh_from_db()
+        self.assertTrue(product.has_thumbnails)
+
+
+class LocalMemoryBackendTest(TestCase):
+    def setUp(self):
+        create_available_products(Restaurant.objects.create(name='Star Burger'), 3)
+        self.now = time.monotonic()
+        self.enterContext(mock.patch('foodcartapp.catalog_cache.time.monotonic', lambda: self.now))
+        self.enterContext(mock.patch('foodcartapp.catalog_cache.get_backend', return_value=LocalMemoryBackend(max_age=60)))
+
+    def test_unchanged_catalog_keeps_etag_after_max_age(self):
+        etag = self.client.get('/api/products/')['ETag']
+        self.now += 61
+
+        response = self.client.get('/api/products/', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_from_other_worker_shows_up_after_max_age(self):
+        etag = self.client.get('/api/products/')['ETag']
+        # update() не шлёт сигналов — так выглядит изменение, сделанное в другом воркере
+        Product.objects.update(price='150.00')
+        self.now += 61
+
+        response = self.client.get('/api/products/', headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual({product['price'] for product in response.json()}, {'150.00'})
+
+
+class AvailabilityMatrixTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.restaurants = Restaurant.objects.bulk_create(
+            Restaurant(name=f'Star Burger {number}') for number in range(2)
+        )
+        self.restaurant_ids = [restaurant.pk for restaurant in self.restaurants]
+        self.burger, self.fries = Product.objects.bulk_create(
+            Product(name=name, price='100.00') for name in ['Бургер', 'Картошка']
+        )
+        self.menu_item = RestaurantMenuItem.objects.create(restaurant=self.restaurants[0], product=self.burger)
+        RestaurantMenuItem.objects.create(restaurant=self.restaurants[1], product=self.fries, availability=False)
+
+    def test_build_matches_menu(self):
+        matrix = AvailabilityMatrix.build()
+
+        self.assertEqual(matrix.row(self.burger.pk, self.restaurant_ids), [True, False])
+        self.assertEqual(matrix.row(self.fries.pk, self.restaurant_ids), [False, False])
+        self.assertEqual(matrix.row(self.burger.pk, [0]), [False])
+
+    def test_set_clears_mask_of_unavailable_product(self):
+        matrix = AvailabilityMatrix.build()
+
+        matrix.set(self.burger.pk, self.restaurant_ids[0], False)
+
+        self.assertNotIn(self.burger.pk, matrix.product_masks)
+
+    def test_save_updates_cached_matrix(self):
+        get_availability_matrix()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            menu_item = RestaurantMenuItem.objects.get(product=self.fries)
+            menu_item.availability = True
+            menu_item.save()
+        with self.assertNumQueries(0):
+            matrix = get_availability_matrix()
+
+        self.assertEqual(matrix.row(self.fries.pk, self.restaurant_ids), [False, True])
+
+    def test_repointed_menu_item_clears_previous_cell(self):
+        get_availability_matrix()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.menu_item.product = self.fries
+            self.menu_item.save()
+        matrix = get_availability_matrix()
+
+        self.assertEqual(matrix.row(self.burger.pk, self.restaurant_ids), [False, False])
+        self.assertEqual(matrix.row(self.fries.pk, self.restaurant_ids), [True, False])
+
+    def test_deleted_menu_item_clears_cell(self):
+        get_availability_matrix()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.menu_item.delete()
+        matrix = get_availability_matrix()
+
+        self.assertEqual(matrix.row(self.burger.pk, self.restaurant_ids), [False, False])
+
+
+class SetAvailabilityTest(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.restaurants = Restaurant.objects.bulk_create(
+            Restaurant(name=f'Star Burger {number}') for number in range(2)
+        )
+        for restaurant in self.restaurants:
+            create_available_products(restaurant, 3)
+        self.product_ids = list(
+            Product.objects.filter(menu_items__restaurant=self.restaurants[0]).values_list('pk', flat=True)
+        )
+        self.receiver = mock.Mock()
+        menu_availability_changed.connect(self.receiver)
+        self.addCleanup(menu_availability_changed.disconnect, self.receiver)
+
+    def get_available_product_ids(self):
+        return set(
+            RestaurantMenuItem.objects.filter(availability=True).values_list('product_id', flat=True)
+        )
+
+    def test_changes_only_given_products(self):
+        updated = set_availability(False, product_ids=self.product_ids[:2])
+
+        self.assertEqual(updated, 2)
+        self.assertNotIn(self.product_ids[0], self.get_available_product_ids())
+        self.assertIn(self.product_ids[2], self.get_available_product_ids())
+
+    def test_changes_only_given_restaurants(self):
+        updated = set_availability(False, restaurant_ids=[self.restaurants[1].pk])
+
+        self.assertEqual(updated, 3)
+        self.assertEqual(self.get_available_product_ids(), set(self.product_ids))
+
+    def test_sends_single_signal_for_all_batches(self):
+        updated = set_availability(False, product_ids=self.product_ids, batch_size=1)
+
+        self.assertEqual(updated, 3)
+        self.receiver.assert_called_once()
+        self.assertEqual(self.receiver.call_args.kwargs['product_ids'], self.product_ids)
+        self.assertIs(self.receiver.call_args.kwargs['available'], False)
+
+    def test_no_signal_when_nothing_changed(self):
+        updated = set_availability(True, product_ids=self.product_ids)
+
+        self.assertEqual(updated, 0)
+        self.receiver.assert_not_called()
+
+    def test_resets_cached_matrix(self):
+        get_availability_matrix()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            set_availability(False, product_ids=self.product_ids[:1])
+
+        restaurant_ids = [self.restaurants[0].pk]
+        self.assertEqual(get_availability_matrix().row(self.product_ids[0], restaurant_ids), [False])
+
+
+class ArchiveOrdersTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Бургер', price='100.00', image='burger.jpg')
+
+    def create_done_order(self, **fields):
+        order = Order.objects.create(**{
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79991234567',
+            'address': 'Москва, Арбат, 1',
+            'status': OrderStatus.DONE,
+            'created_at': timezone.now() - timedelta(days=365),
+            **fields,
+        })
+        OrderItem.objects.create(order=order, product=self.product, quantity=2, price='100.00')
+        return order
+
+    def test_reused_order_id_is_archived_again(self):
+        order = self.create_done_order()
+        archive_batch(timezone.now(), batch_size=100)
+        # Без AUTOINCREMENT или после сброса последовательности база выдаёт id архивного заказа заново
+        self.create_done_order(pk=order.pk, lastname='Сидоров')
+
+        self.assertEqual(archive_batch(timezone.now(), batch_size=100), (1, 1))
+
+        archived_orders = ArchivedOrder.objects.filter(order_id=order.pk).order_by('pk')
+        self.assertEqual([archived.lastname for archived in archived_orders], ['Петров', 'Сидоров'])
+        self.assertEqual([archived.items.count() for archived in archived_orders], [1, 1])
+
+    def test_history_includes_archived_orders(self):
+        archived = self.create_done_order()
+        archive_batch(timezone.now(), batch_size=100)
+        current = self.create_done_order(created_at=timezone.now())
+
+        history = get_order_history(phonenumber='+79991234567').order_by('order_id')
+
+        self.assertEqual(
+            [(order['order_id'], order['archived']) for order in history],
+            [(archived.pk, True), (current.pk, False)],
+        )
+
+
+class LoopCheckingBackend(LocalMemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def get_version(self):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.calls.append('thread')
+        else:
+            self.calls.append('loop')
+        return super().get_version()
+
+
+class AsyncProductListTest(TestCase):
+    async def test_catalog_version_is_read_off_the_event_loop(self):
+        backend = LoopCheckingBackend()
+        # Браузеры всегда присылают Accept-Encoding, а со сжатием ответ ставит слабый ETag
+        headers = {'Accept-Encoding': 'gzip, deflate, br'}
+        with mock.patch('foodcartapp.catalog_cache.get_backend', return_value=backend):
+            response = await async_views.product_list_api(AsyncRequestFactory().get('/api/products/', headers=headers))
+            not_modified = await async_views.product_list_api(
+                AsyncRequestFactory().get('/api/products/', headers={**headers, 'If-None-Match': response['ETag']}),
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertIn('thread', backend.calls)
+        self.assertNotIn('loop', backend.calls)
+
+
+CUSTOMER = {
+    'firstname': 'Иван',
+    'lastname': 'Петров',
+    'phonenumber': '+79991234567',
+    'address': 'Москва, Арбат, 1',
+}
+
+
+class OrderIntakeTest(TestCase):
+    def setUp(self):
+        self.burger = Product.objects.create(name='Бургер', price='100.00', image='burger.jpg')
+        self.fries = Product.objects.create(name='Картошка', price='50.50', image='fries.jpg')
+
+    def test_valid_order(self):
+        response = self.client.post('/api/order/', json.dumps({
+            **CUSTOMER,
+            'products': [{'product': self.burger.pk, 'quantity': 2}, {'product': self.fries.pk, 'quantity': 1}],
+        }), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.json()['id'])
+        self.assertEqual(str(order.total), '250.50')
+        self.assertEqual(
+            sorted(order.items.values_list('product_id', 'quantity', 'price')),
+            sorted([(self.burger.pk, 2, Decimal('100.00')), (self.fries.pk, 1, Decimal('50.50'))]),
+        )
+
+    def test_unknown_products(self):
+        with self.assertRaises(UnknownProductsError) as context:
+            create_order(**CUSTOMER, products=[(self.burger.pk, 1), (404, 1)])
+
+        self.assertEqual(context.exception.product_ids, {404})
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(ORDER_INTAKE_ASYNC=True)
+    def test_queued_order_is_processed(self):
+        response = self.client.post('/api/order/', json.dumps({
+            **CUSTOMER,
+            'products': [{'product': self.burger.pk, 'quantity': 3}],
+        }), content_type='application/json')
+
+        self.assertEqual(response.status_code, 202)
+        [task] = process_intake_tasks()
+        self.assertEqual(task.error, '')
+        self.assertEqual(str(Order.objects.get(pk=response.json()['id']).total), '300.00')
+
+    def test_failed_task_does_not_block_batch(self):
+        failed_order = enqueue_order(**CUSTOMER, products=[[self.burger.pk, 1], [404, 1]])
+        good_order = enqueue_order(**CUSTOMER, products=[[self.fries.pk, 2]])
+
+        tasks = process_intake_tasks()
+
+        self.assertEqual(len(tasks), 2)
+        failed_task = OrderIntakeTask.objects.get(order=failed_order)
+        self.assertIsNotNone(failed_task.processed_at)
+        self.assertIn('404', failed_task.error)
+        self.assertFalse(failed_order.items.exists())
+        self.assertEqual(good_order.items.count(), 1)
+        self.assertEqual(process_intake_tasks(), [])
+
+    def test_processed_task_is_not_claimed_again(self):
+        for _ in range(3):
+            enqueue_order(**CUSTOMER, products=[[self.burger.pk, 1]])
+
+        first_worker_tasks = process_intake_tasks(batch_size=2)
+        second_worker_tasks = process_intake_tasks(batch_size=100)
+
+        self.assertEqual(len(first_worker_tasks), 2)
+        self.assertEqual(len(second_worker_tasks), 1)
+        self.assertFalse({task.pk for task in first_worker_tasks} & {task.pk for task in second_worker_tasks})
+        self.assertEqual(OrderItem.objects.count(), 3)
+
+
+class OrderStatusTest(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(**CUSTOMER)
+
+    def test_allowed_transitions(self):
+        for status in [OrderStatus.CONFIRMED, OrderStatus.COOKING, OrderStatus.DELIVERING, OrderStatus.DONE]:
+            self.order.change_status(status)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, OrderStatus.DONE)
+        self.assertFalse(Order.objects.unprocessed().exists())
+
+    def test_forbidden_transitions(self):
+        forbidden = [
+            (OrderStatus.NEW, OrderStatus.COOKING),
+            (OrderStatus.NEW, OrderStatus.DONE),
+            (OrderStatus.NEW, OrderStatus.NEW),
+            (OrderStatus.COOKING, OrderStatus.CONFIRMED),
+            (OrderStatus.DONE, OrderStatus.DELIVERING),
+        ]
+        for current_status, status in forbidden:
+            with self.subTest(current_status=current_status, status=status):
+                Order.objects.filter(pk=self.order.pk).update(status=current_status)
+                self.order.refresh_from_db()
+
+                with self.assertRaises(InvalidStatusTransition):
+                    self.order.change_status(status)
+
+                self.order.refresh_from_db()
+                self.assertEqual(self.order.status, current_status)
+
+    def test_stale_status_is_rejected(self):
+        first_manager_order = Order.objects.get(pk=self.order.pk)
+        second_manager_order = Order.objects.get(pk=self.order.pk)
+        first_manager_order.change_status(OrderStatus.CONFIRMED)
+        first_manager_order.change_status(OrderStatus.COOKING)
+
+        # Второй менеджер видит заказ новым и подтверждает его поверх уже готовящегося
+        with self.assertRaisesMessage(InvalidStatusTransition, 'Статус заказа уже изменили'):
+            second_manager_order.change_status(OrderStatus.CONFIRMED)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, OrderStatus.COOKING)
+        self.assertEqual(second_manager_order.status, OrderStatus.NEW)
+
+    def get_admin_form(self, status):
+        return OrderAdminForm(instance=self.order, data={**model_to_dict(self.order), 'status': status})
+
+    def test_admin_allows_next_status(self):
+        for status in [OrderStatus.NEW, OrderStatus.CONFIRMED]:
+            with self.subTest(status=status):
+                self.assertTrue(self.get_admin_form(status).is_valid())
+
+    def test_admin_rejects_skipped_status(self):
+        form = self.get_admin_form(OrderStatus.DONE)
+
+        self.assertFalse(form.is_valid())
+        self.assertIn('status', form.errors)
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class OrderIntakeWorkersTest(TransactionTestCase):
+    def test_concurrent_workers_do_not_claim_same_task(self):
+        burger = Product.objects.create(name='Бургер', price='100.00', image='burger.jpg')
+        for _ in range(4):
+            enqueue_order(**CUSTOMER, products=[[burger.pk, 1]])
+
+        first_worker_claimed = threading.Event()
+        second_worker_done = threading.Event()
+        fetch_prices = orders.fetch_prices
+        results = {}
+
+        def fetch_prices_holding_locks(product_ids):
+            # Первый воркер держит блокировки на свои задачи, пока второй разбирает очередь
+            if threading.current_thread().name == 'first':
+                first_worker_claimed.set()
+                second_worker_done.wait(10)
+            return fetch_prices(product_ids)
+
+        def run_worker(batch_size):
+            try:
+                results[threading.current_thread().name] = process_intake_tasks(batch_size)
+            finally:
+                connection.close()
+
+        with mock.patch.object(orders, 'fetch_prices', fetch_prices_holding_locks):
+            first = threading.Thread(target=run_worker, args=[2], name='first')
+            first.start()
+            first_worker_claimed.wait(10)
+            second = threading.Thread(target=run_worker, args=[100], name='second')
+            second.start()
+            second.join(10)
+            second_worker_done.set()
+            first.join(10)
+
+        first_task_ids = {task.pk for task in results['first']}
+        second_task_ids = {task.pk for task in results['second']}
+        self.assertEqual(len(first_task_ids), 2)
+        self.assertEqual(len(second_task_ids), 2)
+        self.assertFalse(first_task_ids & second_task_ids)
+        self.assertEqual(OrderItem.objects.count(), 4)
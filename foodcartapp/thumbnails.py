@@ -0,0 +1,72 @@
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+# Маленькие — для таблиц в админке и у менеджера, большие — для превью и карточек на сайте.
+# Размеры с запасом вдвое под экраны высокой плотности
+SMALL_THUMBNAIL_SIZE = (100, 100)
+LARGE_THUMBNAIL_SIZE = (400, 400)
+THUMBNAIL_SIZES = [SMALL_THUMBNAIL_SIZE, LARGE_THUMBNAIL_SIZE]
+JPEG_QUALITY = 85
+
+
+def get_thumbnail_name(image_name, size):
+    """Путь миниатюры рядом с оригиналом: burger.jpg -> thumbnails/burger_100x100.jpg."""
+    directory, filename = posixpath.split(image_name)
+    root, extension = posixpath.splitext(filename)
+    width, height = size
+    return posixpath.join(directory, 'thumbnails', f'{root}_{width}x{height}{extension}')
+
+
+def get_thumbnail_url(storage, image_name, size, has_thumbnails):
+    """Адрес миниатюры, а пока её нет — адрес оригинала, чтобы на сайте не было битых картинок.
+
+    Есть ли миниатюры, узнаём из флага товара: его ставят, когда их создают, так что хранилище при отдаче не трогаем.
+    """
+    if has_thumbnails:
+        return storage.url(get_thumbnail_name(image_name, size))
+    return storage.url(image_name)
+
+
+def make_thumbnail(storage, image_name, size):
+    with storage.open(image_name) as original:
+        image = Image.open(original)
+        image_format = image.format
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+
+    content = BytesIO()
+    if image_format == 'JPEG':
+        image.convert('RGB').save(content, image_format, quality=JPEG_QUALITY, optimize=True)
+    else:
+        image.save(content, image_format, optimize=True)
+
+    thumbnail_name = get_thumbnail_name(image_name, size)
+    # Имя миниатюры фиксированное, а хранилище при совпадении имён придумало бы новое
+    if storage.exists(thumbnail_name):
+        storage.delete(thumbnail_name)
+    storage.save(thumbnail_name, ContentFile(content.getvalue()))
+    return thumbnail_name
+
+
+def ensure_thumbnail(storage, image_name, size):
+    """Создаёт миниатюру, если её ещё нет. Возвращает False, если картинку не удалось прочитать."""
+    if storage.exists(get_thumbnail_name(image_name, size)):
+        return True
+    try:
+        make_thumbnail(storage, image_name, size)
+    except (OSError, Image.DecompressionBombError) as error:
+        logger.warning('Не удалось сделать миниатюру %s: %s', image_name, error)
+        return False
+    return True
+
+
+def ensure_thumbnails(storage, image_name):
+    """Создаёт миниатюры всех размеров для картинки товара. Возвращает True, если все они есть."""
+    return all([ensure_thumbnail(storage, image_name, size) for size in THUMBNAIL_SIZES])
@@ -1,6 +1,10 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, register_order
+if settings.ASYNC_API_VIEWS:
+    from .async_views import product_list_api, banners_list_api, register_order
+else:
+    from .views import product_list_api, banners_list_api, register_order
 
 
 app_name = "foodcartapp"
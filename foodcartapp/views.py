@@ -1,13 +1,46 @@
-from django.http import JsonResponse
+import gzip
+import hashlib
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.middleware.gzip import re_accepts_gzip
 from django.templatetags.static import static
+from django.utils.cache import patch_vary_headers
+from django.utils.http import quote_etag
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 
 
+from .catalog_cache import get_catalog_blob, get_catalog_version
+from .forms import OrderForm, ProductListQueryForm, encode_cursor
+from .idempotency import idempotent
 from .models import Product
+from .orders import UnknownProductsError, create_order, enqueue_order
+from .serializers import (
+    dump_json,
+    get_product_rows,
+    iter_products_json,
+    serialize_product_rows,
+    serialize_products,
+)
 
 
-def banners_list_api(request):
+DEFAULT_PAGE_SIZE = 100
+STREAM_CHUNK_SIZE = 2000
+
+
+def json_errors(errors, status=400):
+    return JsonResponse({'errors': errors}, status=status, json_dumps_params={
+        'ensure_ascii': False,
+    })
+
+
+@lru_cache(maxsize=None)
+def dump_banners():
     # FIXME move data to db?
-    return JsonResponse([
+    return dump_json([
         {
             'title': 'Burger',
             'src': static('burger.jpg'),
@@ -23,40 +56,132 @@ def banners_list_api(request):
             'src': static('tasty.jpg'),
             'text': 'Food is incomplete without a tasty dessert',
         }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    ])
+
+
+def get_banners_etag(request):
+    return hashlib.md5(dump_banners()).hexdigest()
+
+
+@cache_control(public=True, max_age=settings.BANNERS_CACHE_MAX_AGE)
+@condition(etag_func=get_banners_etag)
+def banners_list_api(request):
+    return HttpResponse(dump_banners(), content_type='application/json')
+
+
+def dump_products(pretty=False):
+    products = Product.objects.available()
+    return dump_json(serialize_products(products), pretty=pretty)
+
+
+def dump_catalog():
+    # Сжатый вариант кэшируется вместе с обычным, иначе GZipMiddleware сжимал бы каталог на каждый запрос
+    content = dump_products()
+    # mtime=0: иначе в заголовок gzip попадает время сборки и одинаковый каталог выглядит изменившимся
+    return content, gzip.compress(content, mtime=0)
+
+
+def load_catalog(request):
+    """Каталог из кэша и его ETag одним вызовом: под ASGI всё это уходит в поток."""
+    return get_catalog_blob(dump_catalog), get_catalog_etag(request)
+
 
+def get_catalog_response(request, catalog, etag):
+    content, compressed_content = catalog
+    if not re_accepts_gzip.search(request.headers.get('Accept-Encoding', '')):
+        response = HttpResponse(content, content_type='application/json')
+    else:
+        response = HttpResponse(compressed_content, content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+        # Байты другие, поэтому ETag слабый — так же поступает GZipMiddleware
+        response['ETag'] = f'W/{quote_etag(etag)}'
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
 
+
+def get_catalog_etag(request):
+    # Разные параметры запроса дают разные тела ответа, значит и разные ETag
+    query_hash = hashlib.md5(request.META.get('QUERY_STRING', '').encode()).hexdigest()[:8]
+    return f'{get_catalog_version(dump_catalog).token}-{query_hash}'
+
+
+def get_catalog_last_modified(request):
+    return get_catalog_version(dump_catalog).modified
+
+
+def filter_products(query):
+    products = Product.objects.available()
+    if query['category']:
+        products = products.in_category(query['category'])
+    if query['special']:
+        products = products.special()
+    return products
+
+
+def dump_products_page(rows, limit, query):
+    # rows содержит на один товар больше страницы, чтобы понять, есть ли следующая
+    next_cursor = encode_cursor(rows[limit - 1]['id']) if len(rows) > limit else None
+    return dump_json({
+        'results': serialize_product_rows(rows[:limit], query['fields']),
+        'next_cursor': next_cursor,
+    }, pretty=query['pretty'])
+
+
+@cache_control(public=True, max_age=settings.CATALOG_CACHE_MAX_AGE)
+@condition(etag_func=get_catalog_etag, last_modified_func=get_catalog_last_modified)
 def product_list_api(request):
-    products = Product.objects.select_related('category').available()
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    if not request.GET:
+        return get_catalog_response(request, *load_catalog(request))
+
+    form = ProductListQueryForm(request.GET)
+    if not form.is_valid():
+        return json_errors(form.errors)
+    query = form.cleaned_data
+    products = filter_products(query)
+
+    if query['stream']:
+        content = iter_products_json(products.order_by('pk'), fields=query['fields'], chunk_size=STREAM_CHUNK_SIZE)
+        return StreamingHttpResponse(content, content_type='application/json')
+
+    if not form.is_paginated:
+        dumped_products = serialize_products(products.order_by('pk'), fields=query['fields'])
+        content = dump_json(dumped_products, pretty=query['pretty'])
+        return HttpResponse(content, content_type='application/json')
+
+    limit = query['limit'] or DEFAULT_PAGE_SIZE
+    # Берём на один товар больше, чтобы понять, есть ли следующая страница
+    rows = list(get_product_rows(products.after(query['cursor'] or 0), query['fields'])[:limit + 1])
+    return HttpResponse(dump_products_page(rows, limit, query), content_type='application/json')
 
 
+def parse_order(request):
+    """Возвращает (поля заказа, None) или (None, ответ с ошибками)."""
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return None, json_errors({'__all__': ['Некорректный JSON']})
+    if not isinstance(payload, dict):
+        return None, json_errors({'__all__': ['Ожидается JSON-объект']})
+
+    form = OrderForm(payload)
+    if not form.is_valid():
+        return None, json_errors(form.errors)
+    return form.cleaned_data, None
+
+
+@require_POST
+@idempotent
 def register_order(request):
-    # TODO это лишь заглушка
-    return JsonResponse({})
+    order_fields, errors_response = parse_order(request)
+    if errors_response:
+        return errors_response
+
+    if settings.ORDER_INTAKE_ASYNC:
+        order = enqueue_order(**order_fields)
+        return JsonResponse({'id': order.id}, status=202)
+
+    try:
+        order = create_order(**order_fields)
+    except UnknownProductsError as error:
+        return json_errors({'products': [str(error)]})
+    return JsonResponse({'id': order.id}, status=201)
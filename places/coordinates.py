@@ -0,0 +1,77 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .geocoders import GeocoderError, get_geocoder
+from .models import Place
+
+
+logger = logging.getLogger(__name__)
+
+GEOCODER_DOWN_CACHE_KEY = 'places:geocoder-down'
+
+
+def normalize_address(address):
+    return ' '.join(address.lower().split())
+
+
+def fetch_coordinates(addresses):
+    """Возвращает {адрес: (широта, долгота) или None} для всех адресов разом.
+
+    Известные адреса берутся из базы одним запросом. К геокодеру за один вызов уходит не больше
+    GEOCODER_MAX_REQUESTS новых адресов, остальные сохраняются без координат и ждут команды
+    refresh_places. Она же обновляет устаревшие записи.
+    """
+    normalized = {address: normalize_address(address) for address in addresses}
+    # Не in_bulk: на SQLite он делит список на пачки по 999 параметров, и запросов становится больше
+    places = {
+        place.address: place
+        for place in Place.objects.filter(address__in=set(normalized.values()))
+    }
+
+    new_addresses = sorted(set(normalized.values()) - places.keys() - {''})
+    geocoder = get_geocoder()
+    geocoder_requests_left = 0 if cache.get(GEOCODER_DOWN_CACHE_KEY) else settings.GEOCODER_MAX_REQUESTS
+    new_places = []
+    for normalized_address in new_addresses:
+        place = Place(address=normalized_address, fetched_at=None)
+        if geocoder_requests_left:
+            geocoder_requests_left -= 1
+            try:
+                place.lat, place.lon = geocoder.geocode(normalized_address) or (None, None)
+                place.fetched_at = timezone.now()
+            except GeocoderError as error:
+                logger.warning(error)
+                # Пока геокодер лежит, страница не ждёт его таймаутов: все адреса дождутся refresh_places
+                cache.set(GEOCODER_DOWN_CACHE_KEY, True, settings.GEOCODER_FAILURE_TTL)
+                geocoder_requests_left = 0
+        places[normalized_address] = place
+        new_places.append(place)
+    Place.objects.bulk_create(new_places, ignore_conflicts=True)
+
+    return {
+        address: places[normalized_address].coordinates if normalized_address in places else None
+        for address, normalized_address in normalized.items()
+    }
+
+
+def refresh_places(max_age, limit=None):
+    geocoder = get_geocoder()
+    # Сначала адреса, которые ещё ни разу не геокодировали
+    places = Place.objects.stale(max_age).order_by(F('fetched_at').asc(nulls_first=True))[:limit]
+
+    refreshed = []
+    for place in places:
+        try:
+            coordinates = geocoder.geocode(place.address)
+        except GeocoderError as error:
+            logger.warning(error)
+            continue
+        place.lat, place.lon = coordinates or (None, None)
+        place.fetched_at = timezone.now()
+        refreshed.append(place)
+    Place.objects.bulk_update(refreshed, ['lat', 'lon', 'fetched_at'])
+    return refreshed
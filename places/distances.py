@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def to_array(coordinates):
+    """Превращает список пар (широта, долгота) в массив N×2, вместо None ставит NaN."""
+    return np.array(
+        [point if point is not None else (np.nan, np.nan) for point in coordinates],
+        dtype=float,
+    ).reshape(-1, 2)
+
+
+def haversine_matrix(origins, destinations):
+    """Расстояния в километрах от каждой точки origins до каждой точки destinations.
+
+    Принимает массивы N×2 и M×2 в градусах, возвращает матрицу N×M.
+    """
+    origins = np.radians(origins)
+    destinations = np.radians(destinations)
+    lat1 = origins[:, 0, np.newaxis]
+    lon1 = origins[:, 1, np.newaxis]
+    lat2 = destinations[np.newaxis, :, 0]
+    lon2 = destinations[np.newaxis, :, 1]
+
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def haversine(origin, destination):
+    lat1, lon1 = map(math.radians, origin)
+    lat2, lon2 = map(math.radians, destination)
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def rank_by_distance(origins, destinations, allowed):
+    """Для каждой точки origins возвращает разрешённые destinations от ближних к дальним.
+
+    allowed — булева матрица N×M. Результат — список списков пар (индекс destination, расстояние),
+    если координаты неизвестны, расстояние равно None и такие пары идут в конце.
+    """
+    distances = haversine_matrix(origins, destinations)
+    # Неизвестные расстояния сортируем после известных, а запрещённые пары — в самый конец и отрезаем
+    sort_keys = np.where(np.isnan(distances), np.finfo(float).max, distances)
+    sort_keys = np.where(allowed, sort_keys, np.inf)
+    order = np.argsort(sort_keys, axis=1, kind='stable')
+
+    counts = allowed.sum(axis=1).tolist()
+    sorted_distances = np.take_along_axis(distances, order, axis=1).tolist()
+
+    ranked = []
+    for columns, row_distances, count in zip(order.tolist(), sorted_distances, counts):
+        ranked.append([
+            # NaN не равен сам себе
+            (column, distance if distance == distance else None)
+            for column, distance in zip(columns[:count], row_distances[:count])
+        ])
+    return ranked
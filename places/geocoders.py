@@ -0,0 +1,71 @@
+import hashlib
+import json
+from functools import lru_cache
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+class GeocoderError(Exception):
+    pass
+
+
+class YandexGeocoder:
+    base_url = 'https://geocode-maps.yandex.ru/1.x'
+
+    def __init__(self, apikey, timeout=5):
+        self.apikey = apikey
+        self.timeout = timeout
+
+    def geocode(self, address):
+        """Возвращает (широту, долготу) или None, если адрес не найден."""
+        query = urlencode({
+            'geocode': address,
+            'apikey': self.apikey,
+            'format': 'json',
+        })
+        try:
+            with urlopen(f'{self.base_url}?{query}', timeout=self.timeout) as response:
+                payload = json.load(response)
+        except (OSError, ValueError) as error:
+            raise GeocoderError(f'Геокодер не ответил на запрос «{address}»: {error}') from error
+
+        found_places = payload['response']['GeoObjectCollection']['featureMember']
+        if not found_places:
+            return None
+        lon, lat = found_places[0]['GeoObject']['Point']['pos'].split(' ')
+        return float(lat), float(lon)
+
+
+class FakeGeocoder:
+    """Не ходит в сеть: выдаёт стабильные координаты в пределах Москвы. Для тестов и разработки."""
+
+    south, west, north, east = 55.57, 37.37, 55.91, 37.84
+
+    def __init__(self, **options):
+        pass
+
+    def geocode(self, address):
+        digest = hashlib.md5(address.encode()).digest()
+        lat_share = int.from_bytes(digest[:4], 'big') / 2 ** 32
+        lon_share = int.from_bytes(digest[4:8], 'big') / 2 ** 32
+        return (
+            self.south + (self.north - self.south) * lat_share,
+            self.west + (self.east - self.west) * lon_share,
+        )
+
+
+@lru_cache(maxsize=None)
+def get_geocoder():
+    geocoder_class = import_string(settings.GEOCODER_BACKEND)
+    return geocoder_class(**settings.GEOCODER_OPTIONS)
+
+
+@receiver(setting_changed)
+def reset_geocoder(setting, **kwargs):
+    if setting in ('GEOCODER_BACKEND', 'GEOCODER_OPTIONS'):
+        get_geocoder.cache_clear()
@@ -0,0 +1,66 @@
+import random
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from places.distances import haversine, haversine_matrix, rank_by_distance, to_array
+
+
+def rank_scalar(origins, destinations, allowed):
+    ranked = []
+    for row, origin in enumerate(origins):
+        candidates = [
+            (column, haversine(origin, destination))
+            for column, destination in enumerate(destinations)
+            if allowed[row][column]
+        ]
+        ranked.append(sorted(candidates, key=lambda candidate: candidate[1]))
+    return ranked
+
+
+def measure(function, *args, repeat):
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - started_at)
+    return min(timings), result
+
+
+def random_point():
+    return random.uniform(55.57, 55.91), random.uniform(37.37, 37.84)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает ранжирование ресторанов по расстоянию: цикл на Python и матрица NumPy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--restaurants', type=int, default=100)
+        parser.add_argument('--availability-ratio', type=float, default=0.5)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        origins = [random_point() for _ in range(options['orders'])]
+        destinations = [random_point() for _ in range(options['restaurants'])]
+        allowed = np.random.random((options['orders'], options['restaurants'])) < options['availability_ratio']
+        allowed_lists = allowed.tolist()
+
+        scalar_elapsed, scalar = measure(rank_scalar, origins, destinations, allowed_lists, repeat=options['repeat'])
+        vectorized_elapsed, vectorized = measure(
+            rank_by_distance,
+            to_array(origins),
+            to_array(destinations),
+            allowed,
+            repeat=options['repeat'],
+        )
+        matrix_elapsed, _ = measure(haversine_matrix, to_array(origins), to_array(destinations), repeat=options['repeat'])
+
+        for scalar_row, vectorized_row in zip(scalar, vectorized):
+            assert [column for column, _ in scalar_row] == [column for column, _ in vectorized_row]
+
+        self.stdout.write(f'цикл на Python  {scalar_elapsed * 1000:9.1f} мс')
+        self.stdout.write(f'NumPy           {vectorized_elapsed * 1000:9.1f} мс')
+        self.stdout.write(f'из них матрица  {matrix_elapsed * 1000:9.1f} мс')
+        self.stdout.write(f'ускорение       {scalar_elapsed / vectorized_elapsed:9.1f}×')
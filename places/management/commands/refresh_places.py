@@ -0,0 +1,25 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from places.coordinates import refresh_places
+
+
+class Command(BaseCommand):
+    help = 'Заново геокодирует адреса, координаты которых давно не обновлялись'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-age-days', type=int, default=30)
+        parser.add_argument('--limit', type=int, default=500, help='сколько адресов обновить за один проход')
+        parser.add_argument('--loop', action='store_true', help='работать в фоне, повторяя проход')
+        parser.add_argument('--interval', type=float, default=60 * 60, help='пауза между проходами, с')
+
+    def handle(self, *args, **options):
+        max_age = timedelta(days=options['max_age_days'])
+        while True:
+            refreshed = refresh_places(max_age, limit=options['limit'])
+            self.stdout.write(f'Обновлено адресов: {len(refreshed)}')
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
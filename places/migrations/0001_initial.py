@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Place',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(help_text='в нормализованном виде: нижний регистр, одиночные пробелы', max_length=200, unique=True, verbose_name='адрес')),
+                ('lat', models.FloatField(blank=True, null=True, verbose_name='широта')),
+                ('lon', models.FloatField(blank=True, null=True, verbose_name='долгота')),
+                ('fetched_at', models.DateTimeField(blank=True, db_index=True, default=django.utils.timezone.now, help_text='пусто — адрес ждёт команды refresh_places', null=True, verbose_name='дата запроса к геокодеру')),
+            ],
+            options={
+                'verbose_name': 'место',
+                'verbose_name_plural': 'места',
+            },
+        ),
+    ]
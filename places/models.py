@@ -0,0 +1,50 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class PlaceQuerySet(models.QuerySet):
+    def stale(self, max_age):
+        return self.filter(Q(fetched_at__isnull=True) | Q(fetched_at__lt=timezone.now() - max_age))
+
+
+class Place(models.Model):
+    address = models.CharField(
+        'адрес',
+        max_length=200,
+        unique=True,
+        help_text='в нормализованном виде: нижний регистр, одиночные пробелы',
+    )
+    lat = models.FloatField(
+        'широта',
+        null=True,
+        blank=True,
+    )
+    lon = models.FloatField(
+        'долгота',
+        null=True,
+        blank=True,
+    )
+    fetched_at = models.DateTimeField(
+        'дата запроса к геокодеру',
+        default=timezone.now,
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text='пусто — адрес ждёт команды refresh_places',
+    )
+
+    objects = PlaceQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'место'
+        verbose_name_plural = 'места'
+
+    def __str__(self):
+        return self.address
+
+    @property
+    def coordinates(self):
+        if self.lat is None or self.lon is None:
+            return None
+        return self.lat, self.lon
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .coordinates import fetch_coordinates, refresh_places
+from .geocoders import FakeGeocoder, GeocoderError
+from .models import Place
+
+
+class CountingGeocoder(FakeGeocoder):
+    calls = 0
+    available = True
+
+    def geocode(self, address):
+        CountingGeocoder.calls += 1
+        if not self.available:
+            raise GeocoderError(f'Геокодер не ответил на запрос «{address}»')
+        return super().geocode(address)
+
+
+@override_settings(
+    GEOCODER_BACKEND='places.tests.CountingGeocoder',
+    GEOCODER_OPTIONS={},
+    GEOCODER_MAX_REQUESTS=3,
+    GEOCODER_FAILURE_TTL=60,
+)
+class FetchCoordinatesTest(TestCase):
+    addresses = [f'Москва, Арбат, {number}' for number in range(10)]
+
+    def setUp(self):
+        cache.clear()
+        CountingGeocoder.calls = 0
+        CountingGeocoder.available = True
+
+    def test_geocoder_requests_are_capped(self):
+        coordinates = fetch_coordinates(self.addresses)
+
+        self.assertEqual(CountingGeocoder.calls, 3)
+        self.assertEqual(sum(point is not None for point in coordinates.values()), 3)
+        self.assertEqual(Place.objects.filter(fetched_at__isnull=True).count(), 7)
+
+        # Следующий показ страницы не ходит в геокодер: оставшиеся адреса ждут refresh_places
+        fetch_coordinates(self.addresses)
+        self.assertEqual(CountingGeocoder.calls, 3)
+
+        refresh_places(max_age=timedelta(days=30))
+        self.assertFalse(Place.objects.filter(fetched_at__isnull=True).exists())
+
+    def test_geocoder_outage_is_remembered(self):
+        CountingGeocoder.available = False
+
+        coordinates = fetch_coordinates(self.addresses[:5])
+        fetch_coordinates(self.addresses[5:])
+
+        self.assertEqual(CountingGeocoder.calls, 1)
+        self.assertEqual(set(coordinates.values()), {None})
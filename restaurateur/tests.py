@@ -1,3 +1,184 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from foodcartapp.models import Order, OrderItem, Product, Restaurant, RestaurantMenuItem
+from places.coordinates import normalize_address
+from places.models import Place
+from star_burger.metrics import Metrics
+
+
+@override_settings(GEOCODER_BACKEND='places.geocoders.FakeGeocoder', GEOCODER_OPTIONS={})
+class OrdersPageQueriesTest(TestCase):
+    # Сессия, пользователь, заказы, позиции заказов, меню ресторанов, рестораны, координаты
+    queries_budget = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', is_staff=True)
+        restaurants = Restaurant.objects.bulk_create(
+            Restaurant(name=f'Ресторан {number}', address=f'Москва, Тверская, {number}')
+            for number in range(5)
+        )
+        cls.products = Product.objects.bulk_create(
+            Product(name=f'Бургер {number}', price='100.00', image=f'burger_{number}.jpg')
+            for number in range(20)
+        )
+        RestaurantMenuItem.objects.bulk_create(
+            RestaurantMenuItem(restaurant=restaurant, product=product)
+            for restaurant in restaurants
+            for product in cls.products
+        )
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def create_orders(self, count):
+        # У каждого заказа свой адрес: больше 999 мест не должны дробить запрос координат
+        orders = Order.objects.bulk_create(
+            Order(
+                firstname='Иван',
+                lastname=f'Петров {number}',
+                phonenumber='+79990000000',
+                address=f'Москва, Арбат, {number}',
+            )
+            for number in range(count)
+        )
+        Place.objects.bulk_create(
+            Place(address=normalize_address(order.address), lat=55.75, lon=37.59 + order.pk / 100000)
+            for order in orders
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, quantity=1, price=product.price)
+            for number, order in enumerate(orders)
+            for product in self.products[number % 10:number % 10 + 2]
+        )
+
+    def assert_orders_page_queries(self, orders_count):
+        self.create_orders(orders_count)
+        url = reverse('restaurateur:view_orders')
+        # Первый запрос геокодирует адреса ресторанов и сохраняет их в базу, бюджет считаем по второму
+        self.client.get(url)
+
+        with self.assertNumQueries(self.queries_budget):
+            response = self.client.get(url)
+
+        self.assertEqual(len(response.context['orders']), orders_count)
+
+    def test_10_orders(self):
+        self.assert_orders_page_queries(10)
+
+    def test_1500_orders(self):
+        self.assert_orders_page_queries(1500)
+
+    def test_10000_orders(self):
+        self.assert_orders_page_queries(10000)
+
+
+class UpdateMenuAvailabilityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', is_staff=True)
+        cls.restaurant = Restaurant.objects.create(name='Star Burger')
+        cls.products = Product.objects.bulk_create(
+            Product(name=f'Бургер {number}', price='100.00') for number in range(3)
+        )
+        RestaurantMenuItem.objects.bulk_create(
+            RestaurantMenuItem(restaurant=cls.restaurant, product=product)
+            for product in cls.products
+        )
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+
+    def post(self, payload):
+        return self.client.post(
+            reverse('restaurateur:update_menu_availability'),
+            json.dumps(payload),
+            content_type='application/json',
+        )
+
+    def test_updates_given_products(self):
+        response = self.post({'available': False, 'products': [self.products[0].pk]})
+
+        self.assertEqual(response.json(), {'updated': 1})
+        self.assertEqual(RestaurantMenuItem.objects.filter(availability=True).count(), 2)
+
+    def test_updates_given_restaurants(self):
+        response = self.post({'available': False, 'restaurants': [self.restaurant.pk]})
+
+        self.assertEqual(response.json(), {'updated': 3})
+
+    def test_rejects_request_without_products_and_restaurants(self):
+        response = self.post({'available': False})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(RestaurantMenuItem.objects.filter(availability=False).exists())
+
+    def test_rejects_invalid_payload(self):
+        payloads = [
+            {'products': [self.products[0].pk]},
+            {'available': 'no', 'products': [self.products[0].pk]},
+            {'available': False, 'products': ['1']},
+            {'available': False, 'restaurants': self.restaurant.pk},
+            [],
+        ]
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post(payload).status_code, 400)
+        self.assertFalse(RestaurantMenuItem.objects.filter(availability=False).exists())
+
+    def test_requires_manager(self):
+        self.client.logout()
+
+        response = self.post({'available': False, 'products': [self.products[0].pk]})
+
+        login_url = reverse('restaurateur:login')
+        self.assertRedirects(
+            response,
+            f'{login_url}?next=/manager/menu/availability/',
+            fetch_redirect_response=False,
+        )
+        self.assertFalse(RestaurantMenuItem.objects.filter(availability=False).exists())
+
+
+BANNERS_VIEW = 'foodcartapp:foodcartapp.views.banners_list_api'
+
+
+class MetricsPageTest(TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        self.enterContext(mock.patch('star_burger.middleware.metrics', self.metrics))
+        self.enterContext(mock.patch('restaurateur.views.metrics', self.metrics))
+
+    def test_requires_manager(self):
+        self.client.force_login(User.objects.create_user('customer'))
+
+        response = self.client.get(reverse('restaurateur:view_metrics'))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(reverse('restaurateur:login')))
+
+    def test_shows_observed_requests(self):
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+        self.client.get('/api/banners/')
+
+        response = self.client.get(reverse('restaurateur:view_metrics'))
+
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = response.content.decode().splitlines()
+        self.assertIn(f'star_burger_responses_total{{view="{BANNERS_VIEW}",status="200"}} 1', lines)
+        self.assertIn(f'star_burger_request_duration_seconds_count{{view="{BANNERS_VIEW}"}} 1', lines)
+
+    def test_json_format(self):
+        self.client.force_login(User.objects.create_user('manager', is_staff=True))
+        self.client.get('/api/banners/')
+
+        response = self.client.get(reverse('restaurateur:view_metrics'), {'format': 'json'})
+
+        histograms = response.json()['views'][BANNERS_VIEW]
+        self.assertEqual(histograms['request_duration_seconds']['count'], 1)
+        self.assertEqual(histograms['request_duration_seconds']['buckets']['+Inf'], 1)
@@ -9,12 +9,14 @@ urlpatterns = [
     path('', lambda request: redirect('restaurateur:ProductsView')),
 
     path('products/', views.view_products, name="ProductsView"),
+    path('menu/availability/', views.update_menu_availability, name="update_menu_availability"),
 
     path('restaurants/', views.view_restaurants, name="RestaurantView"),
 
-    # TODO заглушка для нереализованного функционала
     path('orders/', views.view_orders, name="view_orders"),
 
+    path('metrics/', views.view_metrics, name="view_metrics"),
+
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
 ]
@@ -1,6 +1,13 @@
+import json
+
+import numpy as np
 from django import forms
+from django.core.paginator import Paginator
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
 from django.views import View
+from django.views.decorators.http import require_POST
 from django.urls import reverse_lazy
 from django.contrib.auth.decorators import user_passes_test
 
@@ -8,7 +15,14 @@ from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 
 
-from foodcartapp.models import Product, Restaurant
+from foodcartapp.availability import get_availability_matrix
+from foodcartapp.matching import RestaurantMatcher
+from foodcartapp.menu import set_availability
+from foodcartapp.models import Order, OrderItem, Product, Restaurant
+from foodcartapp.thumbnails import SMALL_THUMBNAIL_SIZE, get_thumbnail_url
+from places.coordinates import fetch_coordinates
+from places.distances import rank_by_distance, to_array
+from star_burger.metrics import metrics
 
 
 class Login(forms.Form):
@@ -59,30 +73,107 @@ class LogoutView(auth_views.LogoutView):
     next_page = reverse_lazy('restaurateur:login')
 
 
+PRODUCTS_PER_PAGE = 50
+RESTAURANTS_PER_PAGE = 10
+
+
 def is_manager(user):
     return user.is_staff  # FIXME replace with specific permission
 
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
-    restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
-
-    products_with_restaurant_availability = []
-    for product in products:
-        availability = {item.restaurant_id: item.availability for item in product.menu_items.all()}
-        ordered_availability = [availability.get(restaurant.id, False) for restaurant in restaurants]
-
-        products_with_restaurant_availability.append(
-            (product, ordered_availability)
+    # Таблица товары × рестораны: листаем товары по строкам, а рестораны — окнами по столбцам
+    products_page = Paginator(
+        Product.objects.select_related('category').order_by('pk'),
+        PRODUCTS_PER_PAGE,
+    ).get_page(request.GET.get('page'))
+    restaurants_page = Paginator(
+        Restaurant.objects.order_by('name', 'pk'),
+        RESTAURANTS_PER_PAGE,
+    ).get_page(request.GET.get('restaurants_page'))
+    availability = get_availability_matrix()
+
+    restaurant_ids = [restaurant.id for restaurant in restaurants_page]
+    for product in products_page:
+        product.thumbnail_url = (
+            get_thumbnail_url(product.image.storage, product.image.name, SMALL_THUMBNAIL_SIZE, product.has_thumbnails)
+            if product.image else None
         )
+    products_with_restaurant_availability = [
+        (product, availability.row(product.id, restaurant_ids))
+        for product in products_page
+    ]
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'restaurants': [
+                {'id': restaurant.id, 'name': restaurant.name}
+                for restaurant in restaurants_page
+            ],
+            'products': [
+                {
+                    'id': product.id,
+                    'name': product.name,
+                    'category': product.category.name if product.category else None,
+                    'price': str(product.price),
+                    'image': product.image.url if product.image else None,
+                    'thumbnail': product.thumbnail_url,
+                    'availability': ordered_availability,
+                }
+                for product, ordered_availability in products_with_restaurant_availability
+            ],
+            'page': products_page.number,
+            'pages': products_page.paginator.num_pages,
+            'restaurants_page': restaurants_page.number,
+            'restaurants_pages': restaurants_page.paginator.num_pages,
+        }, json_dumps_params={
+            'ensure_ascii': False,
+        })
 
     return render(request, template_name="products_list.html", context={
         'products_with_restaurant_availability': products_with_restaurant_availability,
-        'restaurants': restaurants,
+        'restaurants': restaurants_page,
+        'products_page': products_page,
+        'restaurants_page': restaurants_page,
     })
 
 
+def parse_ids(value):
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(type(item) is int for item in value):
+        raise ValueError
+    return value
+
+
+@require_POST
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def update_menu_availability(request):
+    try:
+        payload = json.loads(request.body)
+        available = payload['available']
+        if not isinstance(available, bool):
+            raise ValueError
+        product_ids = parse_ids(payload.get('products'))
+        restaurant_ids = parse_ids(payload.get('restaurants'))
+        # Без обоих списков запрос снял бы с продажи или вернул всё меню сети разом — почти наверняка это ошибка
+        if product_ids is None and restaurant_ids is None:
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({
+            'error': (
+                'Ожидается {"available": true/false, "products": [id, ...], "restaurants": [id, ...]}, '
+                'нужен хотя бы один из списков'
+            ),
+        }, status=400, json_dumps_params={
+            'ensure_ascii': False,
+        })
+
+    updated = set_availability(available, product_ids=product_ids, restaurant_ids=restaurant_ids)
+    return JsonResponse({'updated': updated})
+
+
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_restaurants(request):
     return render(request, template_name="restaurants_list.html", context={
@@ -92,6 +183,45 @@ def view_restaurants(request):
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
+    # Число запросов не зависит от числа заказов: заказы, позиции, меню, рестораны и координаты
+    orders = list(
+        Order.objects
+        .unprocessed()
+        .order_by('created_at')
+        .prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.only('order_id', 'product_id')),
+        )
+    )
+    matcher = RestaurantMatcher.load()
+    restaurants = Restaurant.objects.in_bulk(matcher.restaurant_ids)
+    restaurants = [restaurants[restaurant_id] for restaurant_id in matcher.restaurant_ids]
+
+    allowed = np.zeros((len(orders), len(restaurants)), dtype=bool)
+    for row, order in enumerate(orders):
+        product_ids = {item.product_id for item in order.items.all()}
+        allowed[row, matcher.unpack_indices(matcher.get_mask(product_ids))] = True
+
+    coordinates = fetch_coordinates(
+        [order.address for order in orders] + [restaurant.address for restaurant in restaurants]
+    )
+    ranked_restaurants = rank_by_distance(
+        to_array([coordinates[order.address] for order in orders]),
+        to_array([coordinates[restaurant.address] for restaurant in restaurants]),
+        allowed,
+    )
+    for order, candidates in zip(orders, ranked_restaurants):
+        order.restaurants = [(restaurants[index], distance) for index, distance in candidates]
+
     return render(request, template_name='order_items.html', context={
-        # TODO заглушка для нереализованного функционала
+        'orders': orders,
     })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_metrics(request):
+    # Метрики в памяти процесса: каждый воркер отдаёт свои, суммирует их Prometheus
+    if request.GET.get('format') == 'json':
+        return JsonResponse(metrics.as_dict(), json_dumps_params={
+            'ensure_ascii': False,
+        })
+    return HttpResponse(metrics.as_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
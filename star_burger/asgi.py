@@ -0,0 +1,16 @@
+"""
+ASGI config for Django project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Under ASGI the storefront API is served by async views, see foodcartapp/async_views.py.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "star_burger.settings")
+os.environ.setdefault("ASYNC_API_VIEWS", "True")
+application = get_asgi_application()
@@ -0,0 +1,151 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.db.backends.signals import connection_created
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4 * 1024, 16 * 1024, 64 * 1024, 256 * 1024, 1024 * 1024)
+
+# Статистика запросов к базе текущего HTTP-запроса. ContextVar, а не атрибут соединения:
+# у async view запросы к базе идут в отдельном потоке, со своим соединением
+current_query_stats = ContextVar('current_query_stats', default=None)
+
+
+class QueryStats:
+    __slots__ = ['count', 'duration']
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_query_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - started_at
+
+
+def install_query_wrapper(connection, **kwargs):
+    # Соединение переоткрывается тем же объектом, обёртку ставим один раз
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_wrapper)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Последняя корзина — +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        total = 0
+        for count in self.counts:
+            total += count
+            yield total
+
+
+class Metrics:
+    """Гистограммы по view в памяти процесса. У каждого воркера свои."""
+
+    histograms = {
+        'request_duration_seconds': ('Время ответа', DURATION_BUCKETS),
+        'request_db_queries': ('Число запросов к базе', QUERIES_BUCKETS),
+        'request_db_duration_seconds': ('Время в запросах к базе', DURATION_BUCKETS),
+        'response_size_bytes': ('Размер ответа, потоковые ответы не учитываются', SIZE_BUCKETS),
+    }
+
+    def __init__(self, prefix='star_burger'):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.views = {}
+        self.responses = {}
+
+    def observe(self, view, status_code, duration, query_stats, size=None):
+        with self.lock:
+            if view not in self.views:
+                self.views[view] = {
+                    name: Histogram(buckets)
+                    for name, (_, buckets) in self.histograms.items()
+                }
+            histograms = self.views[view]
+            histograms['request_duration_seconds'].observe(duration)
+            histograms['request_db_queries'].observe(query_stats.count)
+            histograms['request_db_duration_seconds'].observe(query_stats.duration)
+            if size is not None:
+                histograms['response_size_bytes'].observe(size)
+            key = (view, status_code)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def as_dict(self):
+        with self.lock:
+            return {
+                'views': {
+                    view: {
+                        name: {
+                            'buckets': dict(zip(
+                                [*map(str, histogram.buckets), '+Inf'],
+                                histogram.cumulative_counts(),
+                            )),
+                            'sum': histogram.sum,
+                            'count': histogram.count,
+                        }
+                        for name, histogram in histograms.items()
+                    }
+                    for view, histograms in self.views.items()
+                },
+                'responses': [
+                    {'view': view, 'status': status_code, 'count': count}
+                    for (view, status_code), count in self.responses.items()
+                ],
+            }
+
+    def as_prometheus(self):
+        """Текстовый формат Prometheus 0.0.4."""
+        lines = []
+        with self.lock:
+            for name, (description, _) in self.histograms.items():
+                metric = f'{self.prefix}_{name}'
+                lines.append(f'# HELP {metric} {description}')
+                lines.append(f'# TYPE {metric} histogram')
+                for view, histograms in self.views.items():
+                    histogram = histograms[name]
+                    labels = f'view="{escape_label(view)}"'
+                    bounds = [*map(str, histogram.buckets), '+Inf']
+                    for bound, count in zip(bounds, histogram.cumulative_counts()):
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f'{metric}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+
+            metric = f'{self.prefix}_responses_total'
+            lines.append(f'# HELP {metric} Число ответов по кодам')
+            lines.append(f'# TYPE {metric} counter')
+            for (view, status_code), count in self.responses.items():
+                lines.append(f'{metric}{{view="{escape_label(view)}",status="{status_code}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def escape_label(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+metrics = Metrics()
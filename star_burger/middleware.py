@@ -0,0 +1,118 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.middleware.gzip import GZipMiddleware
+
+from .metrics import QueryStats, current_query_stats, install_query_wrapper, metrics
+from .query_inspector import QueryInspector, current_inspector, install_inspector
+
+
+# Ответ короче одного TCP-пакета сжатие не ускоряет, а процессор тратит
+MIN_COMPRESSED_LENGTH = 1400
+
+
+def get_view_name(request):
+    return request.resolver_match.view_name if request.resolver_match else 'unresolved'
+
+
+class LargeResponseGZipMiddleware(GZipMiddleware):
+    """Сжимает только ответы, которые не помещаются в один пакет."""
+
+    def process_response(self, request, response):
+        if not response.streaming and len(response.content) < MIN_COMPRESSED_LENGTH:
+            return response
+        return super().process_response(request, response)
+
+
+class RequestMetricsMiddleware:
+    """Собирает время ответа, число и время запросов к базе и размер ответа по каждому view.
+
+    Стоит первым в MIDDLEWARE, чтобы в замер попала вся цепочка, а размер был уже после сжатия.
+    Метрики отдаёт /manager/metrics/.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        # Соединение могло открыться раньше, чем подключился обработчик connection_created
+        install_query_wrapper(connection)
+        query_stats = QueryStats()
+        token = current_query_stats.set(query_stats)
+        started_at = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_query_stats.reset(token)
+        self.observe(request, response, time.perf_counter() - started_at, query_stats)
+        return response
+
+    async def __acall__(self, request):
+        query_stats = QueryStats()
+        token = current_query_stats.set(query_stats)
+        started_at = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_query_stats.reset(token)
+        self.observe(request, response, time.perf_counter() - started_at, query_stats)
+        return response
+
+    def observe(self, request, response, duration, query_stats):
+        view = get_view_name(request)
+        # У потокового ответа размер становится известен только после отправки
+        size = None if response.streaming else len(response.content)
+        metrics.observe(view, response.status_code, duration, query_stats, size)
+
+
+class QueryInspectorMiddleware:
+    """Режим поиска N+1 и медленных запросов: пишет в лог view и строку кода, откуда они пришли.
+
+    Пороги — QUERY_INSPECTOR_REPEAT_THRESHOLD и QUERY_INSPECTOR_SLOW_QUERY_MS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.repeat_threshold = settings.QUERY_INSPECTOR_REPEAT_THRESHOLD
+        self.slow_query_threshold = settings.QUERY_INSPECTOR_SLOW_QUERY_MS / 1000
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        install_inspector(connection)
+        inspector = QueryInspector(self.repeat_threshold, self.slow_query_threshold)
+        token = current_inspector.set(inspector)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_inspector.reset(token)
+        inspector.report(get_view_name(request))
+        return response
+
+    async def __acall__(self, request):
+        inspector = QueryInspector(self.repeat_threshold, self.slow_query_threshold)
+        token = current_inspector.set(inspector)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_inspector.reset(token)
+        inspector.report(get_view_name(request))
+        return response
@@ -0,0 +1,112 @@
+import logging
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+VALUES_LIST_RE = re.compile(r'\bVALUES\s*\([^()]*\)(?:\s*,\s*\([^()]*\))*', re.IGNORECASE)
+MULTIROW_VALUES_RE = re.compile(r'\bVALUES\s*\([^()]*\)\s*,\s*\(', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+
+# Шаблон пачки bulk_create занимает килобайты, в лог идёт только начало
+MAX_LOGGED_TEMPLATE_LENGTH = 200
+
+# Обёртки запросов и middleware сами стоят в стеке каждого запроса, источником их не считаем
+IGNORED_FILES = {
+    os.path.join(os.path.dirname(__file__), filename)
+    for filename in ['metrics.py', 'middleware.py', 'query_inspector.py']
+}
+
+current_inspector = ContextVar('current_inspector', default=None)
+
+
+def normalize_sql(sql):
+    """Шаблон запроса: литералы заменены на ?, списки IN и VALUES свёрнуты, чтобы одинаковые запросы совпадали."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    sql = VALUES_LIST_RE.sub('VALUES (...)', sql)
+    return WHITESPACE_RE.sub(' ', sql).strip()
+
+
+def is_batch_insert(sql):
+    return MULTIROW_VALUES_RE.search(STRING_RE.sub('?', sql)) is not None
+
+
+def shorten(template):
+    if len(template) <= MAX_LOGGED_TEMPLATE_LENGTH:
+        return template
+    return template[:MAX_LOGGED_TEMPLATE_LENGTH] + '…'
+
+
+def group_queries(sqls):
+    """Возвращает [(шаблон, сколько раз)] от самых частых к редким."""
+    return Counter(normalize_sql(sql) for sql in sqls).most_common()
+
+
+def find_origin():
+    """Ближайшая к запросу строка кода проекта: view, шаблонный тег или __str__ модели."""
+    project_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if filename.startswith(project_dir) and 'site-packages' not in filename and filename not in IGNORED_FILES:
+            return f'{os.path.relpath(filename, project_dir)}:{frame.lineno} в {frame.name}'
+    return 'источник не найден'
+
+
+class QueryInspector:
+    """Группирует запросы одного HTTP-запроса по шаблону и замечает повторы и медленные запросы."""
+
+    def __init__(self, repeat_threshold, slow_query_threshold):
+        self.repeat_threshold = repeat_threshold
+        self.slow_query_threshold = slow_query_threshold
+        self.counts = Counter()
+        self.origins = {}
+
+    def record(self, sql, duration):
+        template = normalize_sql(sql)
+        # Пачки bulk_create сами и есть лекарство от N+1, их повторы не считаем
+        if not is_batch_insert(sql):
+            self.counts[template] += 1
+            # Стек дорогой, снимаем его один раз — когда шаблон впервые дошёл до порога
+            if self.counts[template] == self.repeat_threshold:
+                self.origins[template] = find_origin()
+        if duration >= self.slow_query_threshold:
+            logger.warning('Медленный запрос, %.0f мс: %s (%s)', duration * 1000, shorten(template), find_origin())
+
+    def report(self, view):
+        for template, origin in self.origins.items():
+            logger.warning(
+                'Похоже на N+1 в %s: %d одинаковых запросов «%s», первый повтор из %s',
+                view, self.counts[template], shorten(template), origin,
+            )
+
+
+def inspect_query(execute, sql, params, many, context):
+    inspector = current_inspector.get()
+    if inspector is None:
+        return execute(sql, params, many, context)
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        inspector.record(sql, time.perf_counter() - started_at)
+
+
+def install_inspector(connection, **kwargs):
+    if inspect_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(inspect_query)
+
+
+connection_created.connect(install_inspector)
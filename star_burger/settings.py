@@ -17,45 +17,64 @@ DEBUG = env.bool('DEBUG', True)
 
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', ['127.0.0.1', 'localhost'])
 
+# Отладочные инструменты только для разработки: в проде их middleware впустую проверял бы каждый запрос
+DEBUG_TOOLBAR = env.bool('DEBUG_TOOLBAR', DEBUG)
+# Сжимаем ответы API и страницы. Выключите, если это уже делает nginx
+GZIP_RESPONSES = env.bool('GZIP_RESPONSES', not DEBUG)
+# Гистограммы времени ответа и запросов к базе по view, см. /manager/metrics/
+REQUEST_METRICS = env.bool('REQUEST_METRICS', True)
+# Поиск N+1: одинаковые запросы больше порога за один HTTP-запрос и медленные запросы попадают в лог
+QUERY_INSPECTOR = env.bool('QUERY_INSPECTOR', DEBUG)
+QUERY_INSPECTOR_REPEAT_THRESHOLD = env.int('QUERY_INSPECTOR_REPEAT_THRESHOLD', 5)
+QUERY_INSPECTOR_SLOW_QUERY_MS = env.int('QUERY_INSPECTOR_SLOW_QUERY_MS', 100)
+
 INSTALLED_APPS = [
     'foodcartapp.apps.FoodcartappConfig',
     'restaurateur.apps.RestaurateurConfig',
+    'places.apps.PlacesConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
 ]
 
+# ConditionalGetMiddleware не нужен: API отдаёт ETag сам и дёшево, а в страницах CSRF-токен меняет тело каждый раз
 MIDDLEWARE = [
+    *(['star_burger.middleware.RequestMetricsMiddleware'] if REQUEST_METRICS else []),
+    *(['star_burger.middleware.QueryInspectorMiddleware'] if QUERY_INSPECTOR else []),
     'django.middleware.security.SecurityMiddleware',
+    *(['star_burger.middleware.LargeResponseGZipMiddleware'] if GZIP_RESPONSES else []),
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
-ROOT_URLCONF = 'star_burger.urls'
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append('debug_toolbar')
+    # Как можно раньше, но после middleware, которые сжимают ответ
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.contrib.sessions.middleware.SessionMiddleware'),
+                      'debug_toolbar.middleware.DebugToolbarMiddleware')
+    DEBUG_TOOLBAR_PANELS = [
+        'debug_toolbar.panels.versions.VersionsPanel',
+        'debug_toolbar.panels.timer.TimerPanel',
+        'debug_toolbar.panels.settings.SettingsPanel',
+        'debug_toolbar.panels.headers.HeadersPanel',
+        'debug_toolbar.panels.request.RequestPanel',
+        'debug_toolbar.panels.sql.SQLPanel',
+        'debug_toolbar.panels.staticfiles.StaticFilesPanel',
+        'debug_toolbar.panels.templates.TemplatesPanel',
+        'debug_toolbar.panels.cache.CachePanel',
+        'debug_toolbar.panels.signals.SignalsPanel',
+        'debug_toolbar.panels.logging.LoggingPanel',
+        'debug_toolbar.panels.redirects.RedirectsPanel',
+    ]
 
-DEBUG_TOOLBAR_PANELS = [
-    'debug_toolbar.panels.versions.VersionsPanel',
-    'debug_toolbar.panels.timer.TimerPanel',
-    'debug_toolbar.panels.settings.SettingsPanel',
-    'debug_toolbar.panels.headers.HeadersPanel',
-    'debug_toolbar.panels.request.RequestPanel',
-    'debug_toolbar.panels.sql.SQLPanel',
-    'debug_toolbar.panels.staticfiles.StaticFilesPanel',
-    'debug_toolbar.panels.templates.TemplatesPanel',
-    'debug_toolbar.panels.cache.CachePanel',
-    'debug_toolbar.panels.signals.SignalsPanel',
-    'debug_toolbar.panels.logging.LoggingPanel',
-    'debug_toolbar.panels.redirects.RedirectsPanel',
-]
+ROOT_URLCONF = 'star_burger.urls'
 
 TEMPLATES = [
     {
@@ -77,15 +96,64 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'star_burger.wsgi.application'
 
+CACHES = {
+    'default': env.dj_cache_url('CACHE_URL', 'locmem://'),
+}
+
+CATALOG_CACHE_BACKEND = env.str('CATALOG_CACHE_BACKEND', 'foodcartapp.catalog_cache.LocalMemoryBackend')
+CATALOG_CACHE_OPTIONS = env.json('CATALOG_CACHE_OPTIONS', {})
+CATALOG_CACHE_MAX_AGE = env.int('CATALOG_CACHE_MAX_AGE', 60)
+BANNERS_CACHE_MAX_AGE = env.int('BANNERS_CACHE_MAX_AGE', 60 * 60)
+
+AVAILABILITY_CACHE_ALIAS = env.str('AVAILABILITY_CACHE_ALIAS', 'default')
+AVAILABILITY_CACHE_TIMEOUT = env.int('AVAILABILITY_CACHE_TIMEOUT', 10 * 60)
+
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+
+ORDER_INTAKE_ASYNC = env.bool('ORDER_INTAKE_ASYNC', False)
+
+# Асинхронные версии API витрины; star_burger/asgi.py включает их по умолчанию
+ASYNC_API_VIEWS = env.bool('ASYNC_API_VIEWS', False)
+
+GEOCODER_BACKEND = env.str('GEOCODER_BACKEND', 'places.geocoders.YandexGeocoder')
+GEOCODER_OPTIONS = env.json('GEOCODER_OPTIONS', {
+    'apikey': env.str('YANDEX_GEOCODER_API_KEY', ''),
+})
+GEOCODER_MAX_REQUESTS = env.int('GEOCODER_MAX_REQUESTS', 5)
+GEOCODER_FAILURE_TTL = env.int('GEOCODER_FAILURE_TTL', 60)
+
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
 DATABASES = {
     'default': dj_database_url.config(
-        default='sqlite:////{0}'.format(os.path.join(BASE_DIR, 'db.sqlite3'))
+        default='sqlite:////{0}'.format(os.path.join(BASE_DIR, 'db.sqlite3')),
+        # В проде соединение живёт между запросами, иначе на каждый запрос уходит новое рукопожатие с базой
+        conn_max_age=env.int('DB_CONN_MAX_AGE', 0 if DEBUG else 600),
+        conn_health_checks=env.bool('DB_CONN_HEALTH_CHECKS', not DEBUG),
     )
 }
 
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql' and env.bool('DB_POOL', False):
+    # Пул psycopg сам держит соединения, постоянные соединения Django с ним несовместимы
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default'].setdefault('OPTIONS', {})['pool'] = env.json('DB_POOL_OPTIONS', {}) or True
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3' and env.bool('SQLITE_WAL', not DEBUG):
+    # WAL не блокирует чтение во время записи; IMMEDIATE берёт блокировку на запись в начале транзакции,
+    # поэтому параллельные транзакции ждут по timeout, а не падают с «database is locked»
+    DATABASES['default'].setdefault('OPTIONS', {}).update({
+        'init_command': (
+            'PRAGMA journal_mode=WAL;'
+            'PRAGMA synchronous=NORMAL;'
+            'PRAGMA temp_store=MEMORY;'
+            f'PRAGMA cache_size=-{env.int("SQLITE_CACHE_SIZE_KB", 20000)};'
+            f'PRAGMA mmap_size={env.int("SQLITE_MMAP_SIZE", 128 * 1024 * 1024)};'
+        ),
+        'transaction_mode': 'IMMEDIATE',
+        'timeout': env.int('SQLITE_TIMEOUT', 5),
+    })
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from .query_inspector import group_queries
+
+
+def format_queries_report(captured_queries, budget):
+    lines = [f'Запросов к базе: {len(captured_queries)}, бюджет: {budget}. По шаблонам:']
+    for template, count in group_queries(query['sql'] for query in captured_queries):
+        lines.append(f'{count:>5} × {template}')
+    return '\n'.join(lines)
+
+
+@contextmanager
+def max_queries(budget, using='default'):
+    """Падает с AssertionError, если внутри блока запросов к базе больше бюджета.
+
+    Подходит и для pytest, и для unittest. В отличие от assertNumQueries, проверяет верхнюю
+    границу, а в сообщении группирует запросы по шаблону, так что N+1 видно сразу.
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+    if len(context) > budget:
+        raise AssertionError(format_queries_report(context.captured_queries, budget))
+
+
+class QueryBudgetMixin:
+    """Для django.test.TestCase: проверки бюджета запросов у блока кода и у страницы целиком."""
+
+    def assertMaxQueries(self, budget, using='default'):
+        return max_queries(budget, using)
+
+    def assertViewWithinQueryBudget(self, url, budget, **kwargs):
+        with max_queries(budget):
+            response = self.client.get(url, **kwargs)
+        return response